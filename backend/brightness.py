@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+
+# delay used to roll sun schedule forward when next day schedule is not known yet
+DAY_DURATION = 86400
+
+
+class BrightnessController:
+    """
+    Brightness state machine
+
+    Target level is computed from night mode option, configured levels and day/night
+    state, which is driven by sunrise/sunset schedule. Hardware is only written when
+    effective level changes.
+    """
+
+    def __init__(
+        self,
+        scheduler,
+        read_config,
+        write_level,
+        logger=None,
+        on_change=None,
+        save_level=None,
+        clock=time.time,
+    ):
+        """
+        Constructor
+
+        Args:
+            scheduler (Scheduler): scheduler instance used for sunrise/sunset transitions
+            read_config (function): function returning config field value
+            write_level (function): function writing level to hardware
+            logger (Logger): logger instance
+            on_change (function): function called when day/night state changes
+            save_level (function): function storing applied level (not called on restore)
+            clock (function): wall clock function (timestamp)
+        """
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.__scheduler = scheduler
+        self.__read_config = read_config
+        self.__write_level = write_level
+        self.__save_level = save_level
+        self.__on_change = on_change
+        self.__clock = clock
+        self.__lock = threading.RLock()
+        self.__schedule = None
+        self.__task = None
+        # None means hardware level is unknown
+        self.level = None
+        self.is_night = False
+
+    def get_target(self):
+        """
+        Return target brightness level
+
+        Returns:
+            int: brightness level (0..15)
+        """
+        if self.__read_config("nightmode") and self.is_night:
+            return self.__read_config("nightbrightness")
+        return self.__read_config("brightness")
+
+    def apply(self):
+        """
+        Write target level to hardware if it differs from current level
+
+        Returns:
+            bool: True if level was written
+        """
+        with self.__lock:
+            target = self.get_target()
+            if target == self.level:
+                return False
+
+            self.__write_level(target)
+            self.level = target
+            if self.__save_level:
+                self.__save_level(target)
+            return True
+
+    def restore(self, level):
+        """
+        Write level to hardware as it was before restart, until day/night state is known.
+        Level is not saved again
+
+        Args:
+            level (int): brightness level (0..15)
+        """
+        with self.__lock:
+            self.__write_level(level)
+            self.level = level
+
+    def invalidate(self):
+        """
+        Hardware level is unknown (display reconnected), next apply writes level
+        """
+        with self.__lock:
+            self.level = None
+
+    def set_sun_schedule(self, sunrise, sunset):
+        """
+        Set today sunrise and sunset, and apply brightness of current period.
+        Nothing is done if schedule is unchanged.
+
+        Args:
+            sunrise (float): sunrise timestamp
+            sunset (float): sunset timestamp
+        """
+        with self.__lock:
+            if self.__schedule == (sunrise, sunset):
+                return
+            self.__schedule = (sunrise, sunset)
+            self.__schedule_transition()
+        self.apply()
+
+    def __schedule_transition(self):
+        """
+        Update day/night state and schedule next sunrise or sunset.
+        Must be called with lock acquired
+        """
+        sunrise, sunset = self.__schedule
+        now = self.__clock()
+        if now >= sunset:
+            # schedule of next days is not known yet, roll known one forward so next
+            # transition is always in the future
+            days = (now - sunset) // DAY_DURATION + 1
+            sunrise += days * DAY_DURATION
+            sunset += days * DAY_DURATION
+        if now < sunrise:
+            is_night, next_transition = True, sunrise
+        else:
+            is_night, next_transition = False, sunset
+
+        if is_night != self.is_night:
+            self.logger.info("Switch to %s brightness", "night" if is_night else "day")
+            self.is_night = is_night
+            if self.__on_change:
+                self.__on_change()
+
+        self.__scheduler.cancel(self.__task)
+        self.__task = self.__scheduler.schedule(next_transition - now, self.__transition)
+
+    def __transition(self):
+        """
+        Sunrise or sunset occured
+        """
+        with self.__lock:
+            self.__task = None
+            self.__schedule_transition()
+        self.apply()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+# shared state layout
+SHARED_SEQUENCE = 0
+SHARED_DIGITS = 1
+SHARED_BRIGHTNESS = 5
+SHARED_BLINK = 6
+SHARED_SIZE = 7
+
+# shared value meaning nothing has been set yet
+UNSET = -1
+
+
+def read_shared_state(shared):
+    """
+    Read consistent state from shared memory. Writer makes sequence odd while
+    it updates state, so reader retries until it reads a stable even sequence.
+
+    Args:
+        shared (Array): shared state
+
+    Returns:
+        tuple: sequence, digits (tuple), brightness, blink
+    """
+    while True:
+        sequence = shared[SHARED_SEQUENCE]
+        if sequence % 2:
+            time.sleep(0.0001)
+            continue
+        digits = tuple(shared[SHARED_DIGITS : SHARED_DIGITS + 4])
+        brightness = shared[SHARED_BRIGHTNESS]
+        blink = shared[SHARED_BLINK]
+        if shared[SHARED_SEQUENCE] == sequence:
+            return sequence, digits, brightness, blink
+
+
+def apply_shared_state(lib, shared, applied):
+    """
+    Write shared state to display, only what changed since last write is written
+
+    Args:
+        lib (module): fourletterphat lib
+        shared (Array): shared state
+        applied (dict): last applied state (updated)
+
+    Returns:
+        int: applied sequence
+    """
+    sequence, digits, brightness, blink = read_shared_state(shared)
+
+    if brightness != UNSET and brightness != applied.get("brightness"):
+        lib.set_brightness(brightness)
+        applied["brightness"] = brightness
+    if blink != UNSET and blink != applied.get("blink"):
+        lib.set_blink(blink)
+        applied["blink"] = blink
+    if digits != applied.get("digits"):
+        for pos, digit in enumerate(digits):
+            lib.set_digit_raw(pos, digit)
+        lib.show()
+        applied["digits"] = digits
+
+    return sequence
+
+
+def run_display_process(shared, ack, heartbeat, connection):
+    """
+    Helper process main loop. It is the only place where display bus is accessed.
+
+    It sleeps until parent signals a new state, and exits when parent closes connection.
+
+    Args:
+        shared (Array): shared state
+        ack (Value): last applied sequence
+        heartbeat (Value): monotonic time of last loop iteration
+        connection (Connection): signal connection
+    """
+    heartbeat.value = time.monotonic()
+    lib = importlib.import_module("fourletterphat")
+    applied = {}
+
+    running = True
+    while running:
+        heartbeat.value = time.monotonic()
+        try:
+            # drain signals, latest state is read from shared memory
+            connection.recv_bytes()
+            while connection.poll():
+                connection.recv_bytes()
+        except EOFError:
+            # parent stopped, apply last state before exiting
+            running = False
+
+        heartbeat.value = time.monotonic()
+        ack.value = apply_shared_state(lib, shared, applied)
+
+
+class DisplayProcess:
+    """
+    Display bus access isolated in a supervised helper process
+
+    It exposes the same functions as fourletterphat lib. Frames are written in
+    shared memory and helper process is signaled through a non-blocking pipe, so
+    caller never blocks on display bus. Helper process is restarted when it dies
+    or hangs, and restarted process writes latest state so final frame is not lost.
+    """
+
+    HT16K33_BLINK_OFF = 0x00
+    HT16K33_BLINK_2HZ = 0x02
+    HT16K33_BLINK_1HZ = 0x04
+    HT16K33_BLINK_HALFHZ = 0x06
+
+    # delay before a process that does not apply pending state is considered hung
+    HANG_TIMEOUT = 5.0
+    # max delay between restarts of a process that keeps failing
+    MAX_RESTART_DELAY = 60.0
+
+    def __init__(self, scheduler, logger=None):
+        """
+        Constructor
+
+        Args:
+            scheduler (Scheduler): scheduler instance used for supervision
+            logger (Logger): logger instance
+        """
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.__scheduler = scheduler
+        self.__lock = threading.RLock()
+        self.__context = multiprocessing.get_context("spawn")
+        self.__shared = self.__context.RawArray("l", SHARED_SIZE)
+        self.__shared[SHARED_BRIGHTNESS] = UNSET
+        self.__shared[SHARED_BLINK] = UNSET
+        self.__ack = self.__context.RawValue("l", 0)
+        self.__heartbeat = self.__context.RawValue("d", 0.0)
+        self.__digits = [0, 0, 0, 0]
+        self.__process = None
+        self.__connection = None
+        # monotonic time of oldest state not applied by helper process
+        self.__pending_since = 0.0
+        self.__supervise_task = None
+        self.__restart_delay = 0.0
+        self.restarts = 0
+
+    def start(self):
+        """
+        Start helper process
+        """
+        with self.__lock:
+            self.__start_process()
+
+    def __start_process(self):
+        """
+        Start helper process. Must be called with lock acquired
+        """
+        reader, writer = self.__context.Pipe(duplex=False)
+        os.set_blocking(writer.fileno(), False)
+        self.__process = self.__context.Process(
+            target=run_display_process,
+            args=(self.__shared, self.__ack, self.__heartbeat, reader),
+            name="fourletterdisplay-io",
+            daemon=True,
+        )
+        self.__process.start()
+        reader.close()
+        self.__connection = writer
+        # new process has full timeout to apply pending state
+        self.__pending_since = time.monotonic()
+
+        # make sure restarted process writes latest state
+        self.__signal()
+
+    def stop(self):
+        """
+        Stop helper process. Process applies pending state before exiting
+        """
+        with self.__lock:
+            self.__scheduler.cancel(self.__supervise_task)
+            self.__supervise_task = None
+            if self.__connection:
+                self.__connection.close()
+                self.__connection = None
+            process = self.__process
+            self.__process = None
+
+        if process:
+            process.join(1.0)
+            if process.is_alive():
+                process.kill()
+
+    def set_digit_raw(self, pos, bitmask):
+        if 0 <= pos <= 3:
+            self.__digits[pos] = bitmask
+
+    def clear(self):
+        self.__digits = [0, 0, 0, 0]
+
+    def show(self):
+        self.__write_shared(SHARED_DIGITS, self.__digits)
+
+    def set_brightness(self, brightness):
+        self.__write_shared(SHARED_BRIGHTNESS, [brightness])
+
+    def set_blink(self, frequency):
+        self.__write_shared(SHARED_BLINK, [frequency])
+
+    def __write_shared(self, offset, values):
+        """
+        Write values to shared state and signal helper process
+        """
+        with self.__lock:
+            if self.__ack.value == self.__shared[SHARED_SEQUENCE]:
+                # nothing pending, this state is the oldest not applied one
+                self.__pending_since = time.monotonic()
+            # odd sequence while writing, see read_shared_state
+            self.__shared[SHARED_SEQUENCE] += 1
+            self.__shared[offset : offset + len(values)] = values
+            self.__shared[SHARED_SEQUENCE] += 1
+            self.__signal()
+
+    def __signal(self):
+        """
+        Signal helper process that state changed, and supervise it until state is applied.
+        Must be called with lock acquired
+        """
+        if self.__connection is None:
+            return
+
+        try:
+            self.__connection.send_bytes(b"\x01")
+        except BlockingIOError:
+            # pipe is full: process is busy and will read latest state anyway
+            pass
+        except OSError:
+            self.logger.debug("Display process connection is broken")
+
+        if self.__supervise_task is None:
+            self.__supervise_task = self.__scheduler.schedule(
+                self.HANG_TIMEOUT, self.__supervise
+            )
+
+    def __supervise(self):
+        """
+        Check helper process applied pending state, restart it otherwise
+        """
+        with self.__lock:
+            self.__supervise_process()
+
+    def __supervise_process(self):
+        """
+        Supervise helper process. Must be called with lock acquired
+        """
+        self.__supervise_task = None
+        if self.__process is None:
+            return
+        if self.__ack.value == self.__shared[SHARED_SEQUENCE]:
+            self.__restart_delay = 0.0
+            return
+
+        # pending time is not refreshed by new states, so steady traffic does not hide
+        # a hung process, while a busy process still alive keeps its heartbeat fresh
+        last_activity = max(self.__heartbeat.value, self.__pending_since)
+        if self.__process.is_alive() and time.monotonic() - last_activity < self.HANG_TIMEOUT:
+            self.__supervise_task = self.__scheduler.schedule(
+                self.HANG_TIMEOUT, self.__supervise
+            )
+            return
+
+        self.logger.warning(
+            "Display process is %s, restart it",
+            "hung" if self.__process.is_alive() else "dead",
+        )
+        self.__supervise_task = self.__scheduler.schedule(
+            self.__restart_delay, self.__restart
+        )
+        self.__restart_delay = min(
+            max(self.__restart_delay * 2, 1.0), self.MAX_RESTART_DELAY
+        )
+
+    def __restart(self):
+        """
+        Kill helper process and start a new one
+        """
+        with self.__lock:
+            self.__supervise_task = None
+            if self.__process is None:
+                # stopped meanwhile
+                return
+            if self.__connection:
+                self.__connection.close()
+                self.__connection = None
+            self.__process.kill()
+            # reap process without blocking
+            self.__process.join(0)
+            self.restarts += 1
+            self.__start_process()
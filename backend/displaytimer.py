@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+import time
+
+
+class DisplayTimer:
+    """
+    Countdown or stopwatch computed against monotonic clock
+
+    Time is displayed as MMSS under one hour and as HHMM above. It computes
+    displayed text and delay until displayed text changes, so display only
+    needs to be updated once per change.
+    """
+
+    MODE_COUNTDOWN = "countdown"
+    MODE_STOPWATCH = "stopwatch"
+
+    # 99 hours and 59 minutes (in seconds)
+    MAX_DURATION = 99 * 3600 + 59 * 60
+
+    # margin to make sure displayed value has changed when timer wakes up
+    CHANGE_MARGIN = 0.005
+
+    def __init__(self, mode, duration=None, clock=time.monotonic):
+        """
+        Constructor
+
+        Args:
+            mode (str): timer mode (MODE_COUNTDOWN or MODE_STOPWATCH)
+            duration (int): countdown duration in seconds (only for countdown mode)
+            clock (function): monotonic clock function
+        """
+        self.mode = mode
+        self.duration = duration
+        self.__clock = clock
+        self.started_at = clock()
+
+    def get_elapsed(self, now=None):
+        """
+        Return elapsed seconds since timer started
+
+        Args:
+            now (float): current monotonic time. Defaults to clock value
+
+        Returns:
+            float: elapsed seconds
+        """
+        return (self.__clock() if now is None else now) - self.started_at
+
+    def get_remaining(self, now=None):
+        """
+        Return countdown remaining seconds
+
+        Args:
+            now (float): current monotonic time. Defaults to clock value
+
+        Returns:
+            float: remaining seconds (0 when countdown is over)
+        """
+        return max(0.0, self.duration - self.get_elapsed(now))
+
+    def is_ended(self, now=None):
+        """
+        Return True if countdown is over (stopwatch never ends)
+
+        Args:
+            now (float): current monotonic time. Defaults to clock value
+
+        Returns:
+            bool: True if countdown is over
+        """
+        return self.mode == self.MODE_COUNTDOWN and self.get_remaining(now) == 0.0
+
+    def get_display(self, now=None):
+        """
+        Return text to display and delay until it changes
+
+        Args:
+            now (float): current monotonic time. Defaults to clock value
+
+        Returns:
+            tuple: text to display (HHMM or MMSS) and delay in seconds until text
+                changes (None if it will not change anymore)
+        """
+        now = self.__clock() if now is None else now
+        if self.mode == self.MODE_COUNTDOWN:
+            return self.__get_countdown_display(self.get_remaining(now))
+        return self.__get_stopwatch_display(self.get_elapsed(now))
+
+    def __get_countdown_display(self, remaining):
+        """
+        Countdown displayed values are rounded up (00:01 is displayed until end)
+        """
+        seconds = math.ceil(remaining)
+        if seconds >= 3600:
+            minutes = math.ceil(remaining / 60)
+            next_change = remaining - max((minutes - 1) * 60, 3599)
+            return f"{minutes // 60:02}{minutes % 60:02}", next_change + self.CHANGE_MARGIN
+
+        next_change = remaining - (seconds - 1) if seconds > 0 else None
+        text = f"{seconds // 60:02}{seconds % 60:02}"
+        return text, None if next_change is None else next_change + self.CHANGE_MARGIN
+
+    def __get_stopwatch_display(self, elapsed):
+        """
+        Stopwatch displayed values are rounded down and stops at 99:59
+        """
+        if elapsed < 3600:
+            seconds = math.floor(elapsed)
+            next_change = seconds + 1 - elapsed
+            return f"{seconds // 60:02}{seconds % 60:02}", next_change + self.CHANGE_MARGIN
+
+        minutes = math.floor(elapsed / 60)
+        if minutes * 60 >= self.MAX_DURATION:
+            return "9959", None
+        next_change = (minutes + 1) * 60 - elapsed
+        return f"{minutes // 60:02}{minutes % 60:02}", next_change + self.CHANGE_MARGIN
@@ -2,17 +2,45 @@
 # -*- coding: utf-8 -*-
 
 import importlib
+import itertools
 import sys
+import threading
+import time
 from datetime import datetime
 from cleep.core import CleepRenderer
 from cleep.common import CATEGORIES
 from cleep.profiles.messageprofile import MessageProfile
 from cleep.profiles.alarmprofile import AlarmProfile
 from .fourletterphatdriver import FourLetterPHatDriver
+from .framebuffer import FrameBuffer
+from .displaytimer import DisplayTimer
+from .scheduler import Scheduler
+from .gaugeprofile import GaugeProfile
+from .gauge import GAUGE_FRAMES, get_gauge_level
+from .numberprofile import NumberProfile
+from .numberformat import encode_number, MAX_UNIT_LENGTH
+from .trafficrecorder import TrafficRecorder
+from .displayprocess import DisplayProcess
+from .loadmonitor import LoadMonitor, RedrawThrottle
+from .brightness import BrightnessController
+from .framesnapshot import (
+    FrameSnapshot,
+    SnapshotStore,
+    KIND_NONE,
+    KIND_MESSAGE,
+    KIND_VALUE,
+    VALUE_TTL,
+)
 
 # used for global lib import
 FOUR_LETTER_PHAT = None
 
+# render traffic trace file (/tmp is not a memory filesystem on raspberry pi os, trace is written on sd card)
+TRACE_FILE = "/tmp/fourletterdisplay.trace.gz"
+
+# last frame snapshot file (restored at startup)
+SNAPSHOT_FILE = "/etc/cleep/fourletterdisplay.snapshot"
+
 
 class Fourletterdisplay(CleepRenderer):
     """
@@ -45,11 +73,23 @@ class Fourletterdisplay(CleepRenderer):
         "brightness": 15,
         "nightmode": False,
         "nightbrightness": 4,
+        "isolatedio": False,
+        "lagthreshold": 100,
+        "loadthreshold": 1.5,
     }
 
-    RENDERER_PROFILES = [MessageProfile, AlarmProfile]
+    RENDERER_PROFILES = [MessageProfile, AlarmProfile, GaugeProfile, NumberProfile]
     RENDERER_TYPE = "display"
 
+    # blink period (ms) => HT16K33 blink rate (handled by hardware, no cpu or bus usage)
+    BLINK_RATES = {
+        0: "HT16K33_BLINK_OFF",
+        500: "HT16K33_BLINK_2HZ",
+        1000: "HT16K33_BLINK_1HZ",
+        2000: "HT16K33_BLINK_HALFHZ",
+    }
+    ALARM_BLINK_PERIOD = 500
+
     def __init__(self, bootstrap, debug_enabled):
         """
         Constructor
@@ -60,36 +100,90 @@ class Fourletterdisplay(CleepRenderer):
         """
         CleepRenderer.__init__(self, bootstrap, debug_enabled)
 
+        # events
+        self.countdown_ended_event = self._get_event("fourletterdisplay.countdown.ended")
+
         # members
         self.driver = FourLetterPHatDriver()
         self._register_driver(self.driver)
-        self.is_night_mode = False
-        self.__enabled_dots = [False, False, False, False]
+        self.scheduler = Scheduler(self.logger)
+        self.recorder = TrafficRecorder()
+        self.load_monitor = LoadMonitor(
+            self.scheduler,
+            self.logger,
+            on_change=lambda level: self.__update_state_version(),
+            is_active=self.__has_degradable_work,
+        )
+        # timer redraws have priority over postponed ones
+        self.redraw_throttle = RedrawThrottle(
+            self.scheduler, self.load_monitor, can_redraw=lambda: self.__timer is None
+        )
+        self.brightness = BrightnessController(
+            self.scheduler,
+            lambda field: self._get_config_field(field),
+            self.__write_brightness,
+            self.logger,
+            on_change=self.__update_state_version,
+            # store current brightness to be able to restore it after restart
+            save_level=lambda level: self._set_config_field("currentbrightness", level),
+        )
+        self.__framebuffer = FrameBuffer()
+        self.__timer = None
+        self.__timer_task = None
+        self.__timer_lock = threading.Lock()
+        self.__blink_period = 0
+        self.__alarm_ringing = False
+        # hardware blink is turned off by lib at setup
+        self.__hardware_blink_period = 0
+        self.__display_process = None
+        # versions start from current time (ms) so a version known before restart
+        # is not mistaken for current one (and stays a safe integer for javascript)
+        self.__state_version = time.time_ns() // 1000000
+        self.__state_versions = itertools.count(self.__state_version + 1)
+        self.__content = (KIND_NONE, None)
+        self.snapshot_store = SnapshotStore(
+            self.scheduler, self.cleep_filesystem, SNAPSHOT_FILE, self.__get_snapshot, self.logger
+        )
 
     def _on_start(self):
         """
         App started
         """
+        if self._get_config_field("isolatedio"):
+            self.__start_display_process()
+
+        self.load_monitor.set_thresholds(
+            self._get_config_field("lagthreshold") / 1000,
+            self._get_config_field("loadthreshold"),
+        )
+
         try:
-            self.__change_brightness(self._get_config_field("currentbrightness"))
+            # restore brightness before restart until sunrise/sunset schedule is known
+            self.brightness.restore(self._get_config_field("currentbrightness"))
         except Exception:
             # drop exception when hat is not configured
             pass
+        self.__load_sun_schedule()
 
-        # set current time asap
-        now = datetime.now()
-        time_str = f"{now.hour:02}{now.minute:02}"
-        self.__display_time(time_str)
+        # display last frame (or current time) asap
+        self.__restore_snapshot()
 
     def _on_stop(self):
         """
         Stop app
         """
+        # save frame before display is cleared
+        self.snapshot_store.stop()
         try:
             self.clear()
         except Exception:
             # drop exception when hat is not configured
             pass
+        # display process applies cleared frame before exiting, and must be stopped
+        # before scheduler because it schedules its supervision
+        self.__stop_display_process()
+        self.scheduler.stop()
+        self.recorder.stop()
 
     def on_event(self, event):
         """
@@ -107,23 +201,33 @@ class Fourletterdisplay(CleepRenderer):
                 }
 
         """
-        if event["event"].endswith("time.sunrise") and self._get_config_field(
-            "nightmode"
-        ):
-            brightness = self._get_config_field("brightness")
-            self.logger.info("Disable night mode (set brightness to %s/15)", brightness)
-            self.__change_brightness(brightness)
-            self.is_night_mode = True
-
-        if event["event"].endswith("time.sunset") and self._get_config_field(
-            "nightmode"
-        ):
-            brightness = self._get_config_field("nightbrightness")
-            self.logger.info(
-                "Enable night mode (restore brightness to %s/15)", brightness
-            )
-            self.__change_brightness(brightness)
-            self.is_night_mode = False
+        self.recorder.record_event(event)
+
+        # time event holds today sunrise and sunset, transitions are scheduled by brightness controller
+        params = event.get("params") or {}
+        sunrise, sunset = params.get("sunrise"), params.get("sunset")
+        if event["event"] == "parameters.time.now" and None not in (sunrise, sunset):
+            self.brightness.set_sun_schedule(sunrise, sunset)
+
+    @property
+    def is_night_mode(self):
+        """
+        Return True if it is night (between sunset and sunrise)
+        """
+        return self.brightness.is_night
+
+    def __load_sun_schedule(self):
+        """
+        Load today sunrise and sunset from parameters app
+        """
+        try:
+            resp = self.send_command("get_sun", "parameters")
+            if resp.error:
+                self.logger.debug("Unable to get sun schedule: %s", resp.message)
+                return
+            self.brightness.set_sun_schedule(resp.data["sunrise"], resp.data["sunset"])
+        except Exception:
+            self.logger.debug("Unable to get sun schedule", exc_info=True)
 
     def on_render(self, profile_name, profile_values):
         """
@@ -133,14 +237,58 @@ class Fourletterdisplay(CleepRenderer):
             profile_name (str): rendered profile name
             profile_values (dict): profile values
         """
+        self.recorder.record_render(profile_name, profile_values)
+
         if profile_name == "MessageProfile":
+            if self.__timer is not None:
+                self.logger.debug("Timer is running, message is not displayed")
+                return
             self.__display_time(profile_values["message"])
+        if profile_name == "GaugeProfile":
+            if self.__timer is not None:
+                self.logger.debug("Timer is running, gauge is not displayed")
+                return
+            self.redraw_throttle.redraw(
+                self.__display_gauge,
+                profile_values["value"],
+                profile_values["minimum"],
+                profile_values["maximum"],
+            )
+        if profile_name == "NumberProfile":
+            if self.__timer is not None:
+                self.logger.debug("Timer is running, number is not displayed")
+                return
+            self.redraw_throttle.redraw(
+                self.__display_number,
+                profile_values["value"],
+                profile_values["decimals"],
+                profile_values["unit"],
+            )
         if profile_name == "AlarmProfile":
             if profile_values["status"] in (
                 AlarmProfile.STATUS_SCHEDULED,
                 AlarmProfile.STATUS_UNSCHEDULED,
             ):
                 self.__display_indicator(profile_values["count"] != 0)
+            elif profile_values["status"] == AlarmProfile.STATUS_TRIGGERED:
+                self.__alarm_ringing = True
+                self.__update_state_version()
+                self.__apply_blink()
+            elif profile_values["status"] in (
+                AlarmProfile.STATUS_STOPPED,
+                AlarmProfile.STATUS_SNOOZED,
+            ):
+                self.__alarm_ringing = False
+                self.__update_state_version()
+                self.__apply_blink()
+
+    def __display_current_time(self):
+        """
+        Display current time
+        """
+        now = datetime.now()
+        time_str = f"{now.hour:02}{now.minute:02}"
+        self.__display_time(time_str)
 
     def __display_time(self, time):
         """
@@ -149,8 +297,40 @@ class Fourletterdisplay(CleepRenderer):
         Args:
             time (str): time to display (HHMM)
         """
-        self.display_message(time)
-        self.set_dots(middle_left=True)
+        self.redraw_throttle.drop()
+        self.__display(text=time, content=(KIND_NONE, None), middle_left=True)
+
+    def __display_gauge(self, value, minimum, maximum):
+        """
+        Display value as bar-graph using precomputed frames
+
+        Args:
+            value (float): value to display
+            minimum (float): value displayed as empty gauge
+            maximum (float): value displayed as full gauge
+        """
+        # time separator is meaningless on gauge, alarm indicator is kept
+        self.__display(
+            digits=GAUGE_FRAMES[get_gauge_level(value, minimum, maximum)],
+            content=(KIND_VALUE, time.time() + VALUE_TTL),
+            middle_left=False,
+        )
+
+    def __display_number(self, value, decimals, unit):
+        """
+        Display number using cached digit bitmasks
+
+        Args:
+            value (float): value to display
+            decimals (int): max number of decimals
+            unit (str): unit displayed after value
+        """
+        # time separator would be confused with decimal point, alarm indicator is kept
+        self.__display(
+            digits=encode_number(value, decimals, unit),
+            content=(KIND_VALUE, time.time() + VALUE_TTL),
+            middle_left=False,
+        )
 
     def __display_indicator(self, turn_on):
         """
@@ -159,7 +339,124 @@ class Fourletterdisplay(CleepRenderer):
         Args:
             turn_on (bool): True to turn on indicator, False otherwise
         """
-        self.set_dots(most_right=turn_on)
+        self.__display(most_right=turn_on)
+
+    def __display(self, text=None, digits=None, content=None, **dots):
+        """
+        Update frame buffer and flush changes to display
+
+        Args:
+            text (str, optional): text to display
+            digits (tuple, optional): digit bitmasks to display
+            content (tuple, optional): displayed content kind and expiration timestamp (see framesnapshot)
+            dots (dict, optional): dots to update (see set_dots)
+        """
+        self.__import_lib()
+        with self.__framebuffer:
+            if text is not None:
+                self.__framebuffer.set_text(text)
+            if digits is not None:
+                self.__framebuffer.set_digits(digits)
+            if content is not None:
+                self.__content = content
+            if dots:
+                self.__framebuffer.set_dots(**dots)
+            written = self.__framebuffer.flush(FOUR_LETTER_PHAT)
+
+        if written:
+            self.__update_state_version()
+            self.snapshot_store.schedule(content[0] if content else None)
+
+    def __restore_snapshot(self):
+        """
+        Restore last frame snapshot in a single flush. Current time is displayed
+        if snapshot content is not restorable (time, timer) or expired.
+        """
+        snapshot = self.snapshot_store.load()
+        if snapshot:
+            self.__blink_period = snapshot.blink
+            self.__framebuffer.set_dots(*snapshot.dots)
+
+        if snapshot and snapshot.kind != KIND_NONE:
+            self.__display(
+                digits=snapshot.digits, content=(snapshot.kind, snapshot.expires_at)
+            )
+        else:
+            self.__display_current_time()
+        self.snapshot_store.start()
+
+        try:
+            self.__apply_blink()
+        except Exception:
+            # drop exception when hat is not configured
+            pass
+
+    def __get_snapshot(self):
+        """
+        Return persisted frame layers (content, dots and blink)
+
+        Returns:
+            FrameSnapshot: current frame snapshot
+        """
+        with self.__framebuffer:
+            kind, expires_at = self.__content
+            return FrameSnapshot(
+                kind,
+                0.0,
+                expires_at,
+                self.__framebuffer.get_digits(),
+                self.__framebuffer.get_dots(),
+                self.__blink_period,
+            )
+
+    def __apply_blink(self):
+        """
+        Apply effective blink period on hardware. Ringing alarm has priority over
+        blink period set by user.
+
+        Hardware is only updated when effective blink period changes.
+        """
+        period = (
+            self.ALARM_BLINK_PERIOD if self.__alarm_ringing else self.__blink_period
+        )
+        if period == self.__hardware_blink_period:
+            return
+
+        self.__import_lib()
+        FOUR_LETTER_PHAT.set_blink(getattr(FOUR_LETTER_PHAT, self.BLINK_RATES[period]))
+        self.__hardware_blink_period = period
+        self.__update_state_version()
+
+    def __has_degradable_work(self):
+        """
+        Return True while rendering can be degraded (postponed redraw or running timer)
+
+        Returns:
+            bool: True if degradable work is pending
+        """
+        return self.redraw_throttle.is_pending() or self.__timer is not None
+
+    @staticmethod
+    def __to_float(value):
+        """
+        Convert integer command parameter to float, json does not distinguish
+        integers and floats. Other values are returned as is to be checked.
+
+        Args:
+            value (any): parameter value
+
+        Returns:
+            any: float value if value is an integer, value otherwise
+        """
+        if isinstance(value, int) and not isinstance(value, bool):
+            return float(value)
+        return value
+
+    def __update_state_version(self):
+        """
+        Increment state version, each time displayed or configured state changes
+        """
+        self.__state_version = next(self.__state_versions)
 
     def __import_lib(self):
         """
@@ -168,19 +465,111 @@ class Fourletterdisplay(CleepRenderer):
         Raises:
             Exception if driver not installed or lib not installed or screen not connected
         """
+        global FOUR_LETTER_PHAT
+
         if "fourletterphat" in sys.modules:
             self.logger.debug('Module "fourletterphat" is already loaded')
         if not self.driver.is_installed():
             raise Exception("Four-letter pHAT driver is not installed")
 
+        if self.__display_process is not None:
+            # bus is only accessed by helper process
+            FOUR_LETTER_PHAT = self.__display_process
+            return
+
         try:
-            global FOUR_LETTER_PHAT
             FOUR_LETTER_PHAT = importlib.import_module("fourletterphat")
         except Exception as error:
             raise Exception(
                 "Four-letter pHAT does not seem connected. Please check hardware"
             ) from error
 
+    def __start_display_process(self):
+        """
+        Start display helper process
+        """
+        self.__display_process = DisplayProcess(self.scheduler, self.logger)
+        self.__display_process.start()
+
+    def __stop_display_process(self):
+        """
+        Stop display helper process
+        """
+        if self.__display_process is not None:
+            self.__display_process.stop()
+            self.__display_process = None
+
+    def __reset_display(self):
+        """
+        Write whole display state (frame, brightness and blink) to hardware
+        """
+        self.__import_lib()
+        self.__framebuffer.invalidate()
+        self.__hardware_blink_period = None
+        self.brightness.invalidate()
+        self.brightness.apply()
+        self.__display()
+        self.__apply_blink()
+
+    def enable_isolated_io(self, enable):
+        """
+        Enable isolated I/O: display bus is only accessed by a supervised helper process,
+        so a hung bus or a misbehaving lib cannot block the application.
+
+        Args:
+            enable (bool): True to enable isolated I/O
+        """
+        self._check_parameters([{"name": "enable", "value": enable, "type": bool}])
+
+        self._set_config_field("isolatedio", enable)
+        self.__update_state_version()
+
+        if enable and self.__display_process is None:
+            self.__start_display_process()
+        elif not enable:
+            self.__stop_display_process()
+        self.__reset_display()
+
+    def set_load_thresholds(self, lag_threshold, load_threshold):
+        """
+        Set thresholds above which rendering is degraded (non-critical redraws are
+        postponed and intermediate frames skipped). Clock and alarm indicator are
+        never degraded.
+
+        Args:
+            lag_threshold (int): scheduling lag threshold (ms)
+            load_threshold (float): 1 minute load average threshold (per cpu)
+        """
+        self.recorder.record_command(
+            "set_load_thresholds",
+            lag_threshold=lag_threshold,
+            load_threshold=load_threshold,
+        )
+        load_threshold = self.__to_float(load_threshold)
+        self._check_parameters(
+            [
+                {
+                    "name": "lag_threshold",
+                    "value": lag_threshold,
+                    "type": int,
+                    "validator": lambda val: val > 0,
+                    "message": 'Parameter "lag_threshold" must be greater than 0',
+                },
+                {
+                    "name": "load_threshold",
+                    "value": load_threshold,
+                    "type": float,
+                    "validator": lambda val: val > 0,
+                    "message": 'Parameter "load_threshold" must be greater than 0',
+                },
+            ]
+        )
+
+        self._set_config_field("lagthreshold", lag_threshold)
+        self._set_config_field("loadthreshold", load_threshold)
+        self.load_monitor.set_thresholds(lag_threshold / 1000, load_threshold)
+        self.__update_state_version()
+
     def enable_night_mode(self, enable):
         """
         Enable night mode reducing brightness when sunset event occured.
@@ -188,14 +577,13 @@ class Fourletterdisplay(CleepRenderer):
         Args:
             enable (bool): Enable night mode
         """
+        self.recorder.record_command("enable_night_mode", enable=enable)
         self._check_parameters([{"name": "enable", "value": enable, "type": bool}])
 
         self._set_config_field("nightmode", enable)
+        self.__update_state_version()
 
-        if enable and self.is_night_mode:
-            self.__change_brightness(self._get_config_field("nightbrightness"))
-        else:
-            self.__change_brightness(self._get_config_field("brightness"))
+        self.brightness.apply()
 
     def set_night_mode_brightness(self, brightness):
         """
@@ -204,6 +592,7 @@ class Fourletterdisplay(CleepRenderer):
         Args:
             brightness (int): brighness value (0..15)
         """
+        self.recorder.record_command("set_night_mode_brightness", brightness=brightness)
         self._check_parameters(
             [
                 {
@@ -217,18 +606,25 @@ class Fourletterdisplay(CleepRenderer):
         )
 
         self._set_config_field("nightbrightness", brightness)
+        self.__update_state_version()
 
-        # change brightness
-        if self.is_night_mode:
-            self.__change_brightness(brightness)
+        self.brightness.apply()
 
     def clear(self):
         """
         Clear display
         """
+        self.recorder.record_command("clear")
         self.__import_lib()
-        FOUR_LETTER_PHAT.clear()
-        FOUR_LETTER_PHAT.show()
+        self.redraw_throttle.drop()
+        with self.__framebuffer:
+            FOUR_LETTER_PHAT.clear()
+            FOUR_LETTER_PHAT.show()
+            self.__framebuffer.clear()
+            self.__framebuffer.set_glass(self.__framebuffer.get_frame())
+            self.__content = (KIND_NONE, None)
+        self.__update_state_version()
+        self.snapshot_store.schedule()
 
     def display_message(self, message):
         """
@@ -237,11 +633,79 @@ class Fourletterdisplay(CleepRenderer):
         Args:
             message (string): message to display
         """
+        self.recorder.record_command("display_message", message=message)
         self._check_parameters([{"name": "message", "value": message, "type": str}])
 
-        self.__import_lib()
-        FOUR_LETTER_PHAT.print_str(message)
-        FOUR_LETTER_PHAT.show()
+        self.redraw_throttle.drop()
+        self.__display(text=message, content=(KIND_MESSAGE, None))
+
+    def display_gauge(self, value, minimum=0.0, maximum=100.0):
+        """
+        Display value as bar-graph (24 levels over the 4 digits)
+
+        Args:
+            value (float): value to display
+            minimum (float, optional): value displayed as empty gauge. Defaults to 0.
+            maximum (float, optional): value displayed as full gauge. Defaults to 100.
+        """
+        self.recorder.record_command(
+            "display_gauge", value=value, minimum=minimum, maximum=maximum
+        )
+        value, minimum, maximum = [
+            self.__to_float(val) for val in (value, minimum, maximum)
+        ]
+        self._check_parameters(
+            [
+                {"name": "value", "value": value, "type": float},
+                {"name": "minimum", "value": minimum, "type": float},
+                {
+                    "name": "maximum",
+                    "value": maximum,
+                    "type": float,
+                    "validator": lambda val: val > minimum,
+                    "message": 'Parameter "maximum" must be greater than "minimum"',
+                },
+            ]
+        )
+
+        self.redraw_throttle.redraw(self.__display_gauge, value, minimum, maximum)
+
+    def display_number(self, value, decimals=0, unit=""):
+        """
+        Display number fitted on 4 digits. Decimals are reduced if value is too wide
+        and too large values are displayed as "Hi" or "Lo"
+
+        Args:
+            value (float): value to display
+            decimals (int, optional): max number of decimals. Defaults to 0.
+            unit (str, optional): unit displayed after value (2 chars max). Defaults to "".
+        """
+        self.recorder.record_command(
+            "display_number", value=value, decimals=decimals, unit=unit
+        )
+        value = self.__to_float(value)
+        self._check_parameters(
+            [
+                {"name": "value", "value": value, "type": float},
+                {
+                    "name": "decimals",
+                    "value": decimals,
+                    "type": int,
+                    "validator": lambda val: 0 <= val <= 3,
+                    "message": 'Parameter "decimals" must be between 0..3',
+                },
+                {
+                    "name": "unit",
+                    "value": unit,
+                    "type": str,
+                    "empty": True,
+                    "validator": lambda val: len(val) <= MAX_UNIT_LENGTH,
+                    "message": f'Parameter "unit" must be {MAX_UNIT_LENGTH} chars max',
+                },
+            ]
+        )
+
+        self.redraw_throttle.redraw(self.__display_number, value, decimals, unit)
 
     def set_brightness(self, brightness):
         """
@@ -250,6 +714,7 @@ class Fourletterdisplay(CleepRenderer):
         Args:
             brightness (int): brighness value (0..15)
         """
+        self.recorder.record_command("set_brightness", brightness=brightness)
         self._check_parameters(
             [
                 {
@@ -264,23 +729,45 @@ class Fourletterdisplay(CleepRenderer):
 
         # save value
         self._set_config_field("brightness", brightness)
+        self.__update_state_version()
 
-        # change brightness
-        if not self.is_night_mode:
-            self.__change_brightness(brightness)
+        self.brightness.apply()
 
-    def __change_brightness(self, brightness):
+    def set_blink(self, period):
         """
-        Change brightness
+        Make display blinking. Blinking is handled by hardware.
+
+        Args:
+            period (int): blink period in ms (0 to disable blinking, 500, 1000 or 2000)
+        """
+        self.recorder.record_command("set_blink", period=period)
+        self._check_parameters(
+            [
+                {
+                    "name": "period",
+                    "value": period,
+                    "type": int,
+                    "validator": lambda val: val in self.BLINK_RATES,
+                    "message": 'Parameter "period" must be 0, 500, 1000 or 2000',
+                },
+            ]
+        )
+
+        self.__blink_period = period
+        self.__update_state_version()
+        self.__apply_blink()
+        self.snapshot_store.schedule()
+
+    def __write_brightness(self, brightness):
+        """
+        Write brightness to hardware (called by brightness controller when level changes)
 
         Args:
             brightness (int): brighness value (0..15)
         """
         self.__import_lib()
         FOUR_LETTER_PHAT.set_brightness(brightness)
-
-        # store current brightness to be able to restore it after restart
-        self._set_config_field("currentbrightness", brightness)
+        self.__update_state_version()
 
     def set_dots(
         self, most_left=None, middle_left=None, middle_right=None, most_right=None
@@ -301,17 +788,203 @@ class Fourletterdisplay(CleepRenderer):
             middle_right,
             most_right,
         )
-        self.__import_lib()
-        if most_left is not None:
-            self.__enabled_dots[0] = most_left
-        if middle_left is not None:
-            self.__enabled_dots[1] = middle_left
-        if middle_right is not None:
-            self.__enabled_dots[2] = middle_right
-        if most_right is not None:
-            self.__enabled_dots[3] = most_right
-
-        for led, value in enumerate(self.__enabled_dots):
-            FOUR_LETTER_PHAT.set_decimal(led, value)
-
-        FOUR_LETTER_PHAT.show()
+        self.recorder.record_command(
+            "set_dots",
+            most_left=most_left,
+            middle_left=middle_left,
+            middle_right=middle_right,
+            most_right=most_right,
+        )
+        self.__display(
+            most_left=most_left,
+            middle_left=middle_left,
+            middle_right=middle_right,
+            most_right=most_right,
+        )
+
+    def get_state(self, version=None):
+        """
+        Return display state snapshot. State version is incremented each time state
+        changes, so caller can send its last version to avoid getting unchanged state.
+
+        Args:
+            version (int, optional): last state version known by caller
+
+        Returns:
+            dict: state snapshot. Only version and unchanged fields are returned if
+                state is unchanged::
+
+                {
+                    version (int): state version
+                    unchanged (bool): True if state did not change since specified version
+                    text (str): displayed text (None if frame is not a text, like gauge)
+                    frame (list): displayed digit bitmasks
+                    dots (list): dots states
+                    brightness (int): current brightness
+                    isnightmode (bool): True if night mode is active
+                    blink (int): blink period set by user (ms)
+                    alarmringing (bool): True if an alarm is ringing
+                    timer (dict): running timer infos (mode, duration, elapsed) or None
+                    load (dict): rendering load infos (level, changes, postponed, lag, load)
+                    config (dict): application config
+                }
+
+        """
+        self._check_parameters(
+            [{"name": "version", "value": version, "type": int, "none": True}]
+        )
+
+        current_version = self.__state_version
+        if version == current_version:
+            return {"version": current_version, "unchanged": True}
+
+        timer = self.__timer
+        return {
+            "version": current_version,
+            "unchanged": False,
+            "text": self.__framebuffer.get_text(),
+            "frame": list(self.__framebuffer.get_frame()),
+            "dots": self.__framebuffer.get_dots(),
+            "brightness": self._get_config_field("currentbrightness"),
+            "isnightmode": self.is_night_mode,
+            "blink": self.__blink_period,
+            "alarmringing": self.__alarm_ringing,
+            "timer": (
+                {
+                    "mode": timer.mode,
+                    "duration": timer.duration,
+                    "elapsed": round(timer.get_elapsed(), 1),
+                }
+                if timer
+                else None
+            ),
+            "load": self.load_monitor.get_infos(),
+            "config": self._get_config(),
+        }
+
+    def start_countdown(self, duration):
+        """
+        Start countdown. Remaining time is displayed as MMSS (or HHMM above one hour)
+        and fourletterdisplay.countdown.ended event is emitted when countdown is over.
+
+        Time messages are not displayed while countdown is running.
+
+        Args:
+            duration (int): countdown duration in seconds
+        """
+        self.recorder.record_command("start_countdown", duration=duration)
+        self._check_parameters(
+            [
+                {
+                    "name": "duration",
+                    "value": duration,
+                    "type": int,
+                    "validator": lambda val: 0 < val <= DisplayTimer.MAX_DURATION,
+                    "message": f'Parameter "duration" must be between 1..{DisplayTimer.MAX_DURATION}',
+                },
+            ]
+        )
+
+        self.__start_timer(DisplayTimer(DisplayTimer.MODE_COUNTDOWN, duration))
+
+    def start_stopwatch(self):
+        """
+        Start stopwatch. Elapsed time is displayed as MMSS (or HHMM above one hour)
+
+        Time messages are not displayed while stopwatch is running.
+        """
+        self.recorder.record_command("start_stopwatch")
+        self.__start_timer(DisplayTimer(DisplayTimer.MODE_STOPWATCH))
+
+    def start_recording(self):
+        """
+        Start recording render traffic (renders, events and commands) to trace file
+        """
+        self.recorder.start(TRACE_FILE)
+        self.logger.info("Render traffic recording started")
+
+    def stop_recording(self):
+        """
+        Stop recording render traffic
+
+        Returns:
+            dict: recording infos::
+
+                {
+                    path (str): trace file path
+                    records (int): number of records
+                }
+
+        """
+        infos = self.recorder.stop()
+        self.logger.info("Render traffic recording stopped (%s records)", infos["records"])
+        return infos
+
+    def stop_timer(self):
+        """
+        Stop running countdown or stopwatch and display current time
+        """
+        self.recorder.record_command("stop_timer")
+        with self.__timer_lock:
+            self.__cancel_timer_task()
+            self.__timer = None
+        self.__update_state_version()
+
+        self.__display_current_time()
+
+    def __start_timer(self, timer):
+        """
+        Start specified timer, replacing running one
+
+        Args:
+            timer (DisplayTimer): timer instance
+        """
+        with self.__timer_lock:
+            self.__cancel_timer_task()
+            self.__timer = timer
+        self.redraw_throttle.drop()
+        self.__update_state_version()
+        # timer ticks are degraded when host is busy
+        self.load_monitor.notify_activity()
+
+        self.__update_timer(timer)
+
+    def __cancel_timer_task(self):
+        """
+        Cancel scheduled timer update
+        """
+        self.scheduler.cancel(self.__timer_task)
+        self.__timer_task = None
+
+    def __update_timer(self, timer):
+        """
+        Display timer value and schedule next update when displayed value changes
+
+        Args:
+            timer (DisplayTimer): updated timer
+        """
+        with self.__timer_lock:
+            if timer is not self.__timer:
+                # timer stopped or replaced meanwhile
+                return
+
+            text, next_change = timer.get_display()
+            self.__display(text=text, content=(KIND_NONE, None), middle_left=True)
+
+            if next_change is not None:
+                # skip intermediate stopwatch frames when host is busy, countdown end stays on time
+                next_change = max(next_change, self.load_monitor.get_redraw_period())
+                if timer.mode == DisplayTimer.MODE_COUNTDOWN:
+                    next_change = min(next_change, timer.get_remaining())
+                self.__timer_task = self.scheduler.schedule(
+                    next_change, self.__update_timer, args=(timer,)
+                )
+                return
+
+            self.__timer_task = None
+            self.__timer = None
+        self.__update_state_version()
+
+        if timer.mode == DisplayTimer.MODE_COUNTDOWN:
+            self.logger.info("Countdown of %ss is over", timer.duration)
+            self.countdown_ended_event.send(params={"duration": timer.duration})
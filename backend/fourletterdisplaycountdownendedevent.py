@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+
+class FourletterdisplayCountdownEndedEvent(Event):
+    """
+    Fourletterdisplay.countdown.ended event
+    """
+
+    EVENT_NAME = "fourletterdisplay.countdown.ended"
+    EVENT_PROPAGATE = True
+    EVENT_PARAMS = ["duration"]
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
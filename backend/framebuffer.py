@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from .segments import DIGITS_COUNT, DECIMAL_MASK, encode_text
+
+
+class FrameBuffer:
+    """
+    Display frame buffer
+
+    It keeps track of frame displayed on glass to only write changed digits to
+    lib buffer and to flush display only when frame really changed.
+
+    Frame buffer can be used as context manager to perform atomic updates::
+
+        with framebuffer:
+            framebuffer.set_text("1234")
+            framebuffer.set_dots(middle_left=True)
+            framebuffer.flush(lib)
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.__lock = threading.RLock()
+        self.__digits = [0] * DIGITS_COUNT
+        self.__dots = [False] * DIGITS_COUNT
+        self.__text = ""
+        # None means glass content is unknown and needs full write
+        self.__glass = None
+
+    def __enter__(self):
+        self.__lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__lock.release()
+
+    def set_text(self, text):
+        """
+        Set frame text (only 4 chars are kept)
+
+        Args:
+            text (str): text to display
+        """
+        with self.__lock:
+            self.set_digits(encode_text(text))
+            self.__text = text
+
+    def set_digits(self, digits):
+        """
+        Set frame digits
+
+        Args:
+            digits (tuple): 4 digit bitmasks (decimal points are merged with frame dots)
+        """
+        with self.__lock:
+            self.__digits[:] = digits
+            self.__text = None
+
+    def set_dots(
+        self, most_left=None, middle_left=None, middle_right=None, most_right=None
+    ):
+        """
+        Set frame dots. None value keeps current dot state
+
+        Args:
+            most_left (bool): most left dot state
+            middle_left (bool): middle left dot state
+            middle_right (bool): middle right dot state
+            most_right (bool): most right dot state
+        """
+        with self.__lock:
+            for pos, dot in enumerate((most_left, middle_left, middle_right, most_right)):
+                if dot is not None:
+                    self.__dots[pos] = dot
+
+    def get_digits(self):
+        """
+        Return frame digits
+
+        Returns:
+            tuple: 4 digit bitmasks (without frame dots)
+        """
+        with self.__lock:
+            return tuple(self.__digits)
+
+    def get_text(self):
+        """
+        Return frame text
+
+        Returns:
+            str: frame text or None if frame digits were not set from text
+        """
+        with self.__lock:
+            return self.__text
+
+    def get_dots(self):
+        """
+        Return frame dots
+
+        Returns:
+            list: list of 4 dots states
+        """
+        with self.__lock:
+            return list(self.__dots)
+
+    def get_frame(self):
+        """
+        Return frame as it will be displayed on glass
+
+        Returns:
+            tuple: 4 digit bitmasks (including decimal point)
+        """
+        with self.__lock:
+            return tuple(
+                digit | (DECIMAL_MASK if dot else 0)
+                for digit, dot in zip(self.__digits, self.__dots)
+            )
+
+    def clear(self):
+        """
+        Clear frame (digits and dots)
+        """
+        with self.__lock:
+            self.__digits = [0] * DIGITS_COUNT
+            self.__dots = [False] * DIGITS_COUNT
+            self.__text = ""
+
+    def set_glass(self, frame):
+        """
+        Set frame currently displayed on glass, when it is updated outside frame buffer
+
+        Args:
+            frame (tuple): displayed frame or None if unknown
+        """
+        with self.__lock:
+            self.__glass = frame
+
+    def invalidate(self):
+        """
+        Invalidate glass content, next flush will write whole frame
+        """
+        self.set_glass(None)
+
+    def flush(self, lib):
+        """
+        Write changed digits to lib and show them
+
+        Args:
+            lib (module): fourletterphat lib
+
+        Returns:
+            int: number of written digits (0 means display was not flushed)
+        """
+        with self.__lock:
+            frame = self.get_frame()
+            written = 0
+            for pos, digit in enumerate(frame):
+                if self.__glass is None or self.__glass[pos] != digit:
+                    lib.set_digit_raw(pos, digit)
+                    written += 1
+
+            if written:
+                lib.show()
+            self.__glass = frame
+
+            return written
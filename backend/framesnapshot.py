@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections
+import logging
+import os
+import struct
+import threading
+import time
+from .segments import DIGITS_COUNT
+
+# snapshot layout: magic, version, content kind, saved at, content expires at (0 means never),
+# 4 digits, dots bitmask, blink period
+SNAPSHOT_STRUCT = struct.Struct("<4sBBdd4HBH")
+SNAPSHOT_MAGIC = b"FLDS"
+SNAPSHOT_VERSION = 1
+
+# content is not restored (current time is displayed instead)
+KIND_NONE = 0
+# message displayed by user, restored until it is replaced
+KIND_MESSAGE = 1
+# value (gauge or number) restored while it is not expired
+KIND_VALUE = 2
+
+# delay (in seconds) during which a value is still meaningful
+VALUE_TTL = 900.0
+
+FrameSnapshot = collections.namedtuple(
+    "FrameSnapshot", ["kind", "saved_at", "expires_at", "digits", "dots", "blink"]
+)
+
+
+def pack_snapshot(snapshot):
+    """
+    Pack snapshot to bytes
+
+    Args:
+        snapshot (FrameSnapshot): snapshot
+
+    Returns:
+        bytes: packed snapshot
+    """
+    dots = sum(1 << pos for pos, dot in enumerate(snapshot.dots) if dot)
+    return SNAPSHOT_STRUCT.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        snapshot.kind,
+        snapshot.saved_at,
+        snapshot.expires_at or 0.0,
+        *snapshot.digits,
+        dots,
+        snapshot.blink,
+    )
+
+
+def unpack_snapshot(data, now):
+    """
+    Unpack snapshot. Expired content is dropped
+
+    Args:
+        data (bytes): packed snapshot
+        now (float): current timestamp
+
+    Returns:
+        FrameSnapshot: snapshot or None if data is not a valid snapshot
+    """
+    if len(data) != SNAPSHOT_STRUCT.size:
+        return None
+    magic, version, kind, saved_at, expires_at, *values = SNAPSHOT_STRUCT.unpack(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        return None
+
+    digits, dots, blink = tuple(values[:DIGITS_COUNT]), values[DIGITS_COUNT], values[-1]
+    if kind not in (KIND_MESSAGE, KIND_VALUE) or (expires_at and expires_at <= now):
+        kind, expires_at, digits = KIND_NONE, None, (0,) * DIGITS_COUNT
+
+    return FrameSnapshot(
+        kind,
+        saved_at,
+        expires_at or None,
+        digits,
+        [bool(dots & (1 << pos)) for pos in range(DIGITS_COUNT)],
+        blink,
+    )
+
+
+def save_snapshot(cleep_filesystem, path, data):
+    """
+    Write packed snapshot to file. File is replaced atomically so a power loss
+    never leaves a truncated snapshot.
+
+    Args:
+        cleep_filesystem (CleepFilesystem): cleep filesystem instance (root filesystem is read-only)
+        path (str): snapshot file path
+        data (bytes): packed snapshot
+    """
+    temp_path = f"{path}.tmp"
+    snapshot_file = cleep_filesystem.open(temp_path, "wb")
+    try:
+        snapshot_file.write(data)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    finally:
+        cleep_filesystem.close(snapshot_file)
+    cleep_filesystem.rename(temp_path, path)
+
+
+def load_snapshot(path, now):
+    """
+    Read snapshot from file
+
+    Args:
+        path (str): snapshot file path
+        now (float): current timestamp
+
+    Returns:
+        FrameSnapshot: snapshot or None if file does not exist or is invalid
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as snapshot_file:
+        return unpack_snapshot(snapshot_file.read(), now)
+
+
+class SnapshotStore:
+    """
+    Frame snapshot persistence
+
+    Changes are coalesced during a delay before being saved, and snapshot is only
+    written when it differs from last saved (or restored) one.
+    """
+
+    # delay (in seconds) to coalesce snapshot writes
+    SAVE_DELAY = 5.0
+    # delay (in seconds) to coalesce snapshot writes of values (gauge, number) that
+    # may change continuously, they are saved anyway when store is stopped
+    VALUE_SAVE_DELAY = 600.0
+
+    def __init__(
+        self,
+        scheduler,
+        cleep_filesystem,
+        path,
+        get_snapshot,
+        logger=None,
+        clock=time.monotonic,
+        wall_clock=time.time,
+    ):
+        """
+        Constructor
+
+        Args:
+            scheduler (Scheduler): scheduler instance used for delayed saves
+            cleep_filesystem (CleepFilesystem): cleep filesystem instance
+            path (str): snapshot file path
+            get_snapshot (function): function returning current FrameSnapshot
+            logger (Logger): logger instance
+            clock (function): monotonic clock function
+            wall_clock (function): wall clock function (timestamp)
+        """
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.cleep_filesystem = cleep_filesystem
+        self.path = path
+        self.__scheduler = scheduler
+        self.__get_snapshot = get_snapshot
+        self.__clock = clock
+        self.__wall_clock = wall_clock
+        self.__lock = threading.Lock()
+        self.__task = None
+        self.__due_at = 0.0
+        self.__enabled = False
+        self.__saved = None
+
+    def load(self):
+        """
+        Load last saved snapshot
+
+        Returns:
+            FrameSnapshot: snapshot or None if there is no valid snapshot
+        """
+        try:
+            snapshot = load_snapshot(self.path, self.__wall_clock())
+        except Exception:
+            self.logger.warning("Unable to load frame snapshot", exc_info=True)
+            return None
+
+        if snapshot:
+            self.logger.debug("Restore frame snapshot %s", snapshot)
+            self.__saved = snapshot._replace(saved_at=0.0)
+        return snapshot
+
+    def start(self):
+        """
+        Start saving changes (once restored snapshot is displayed)
+        """
+        self.__enabled = True
+
+    def stop(self):
+        """
+        Stop saving changes and save pending one
+        """
+        self.__enabled = False
+        self.save()
+
+    def schedule(self, kind=None):
+        """
+        Schedule snapshot save. Changes occuring during save delay are saved at once,
+        and a pending value save is brought forward by other changes
+
+        Args:
+            kind (int, optional): displayed content kind when content changed
+        """
+        delay = self.VALUE_SAVE_DELAY if kind == KIND_VALUE else self.SAVE_DELAY
+        with self.__lock:
+            if not self.__enabled:
+                return
+            due_at = self.__clock() + delay
+            if self.__task is not None and self.__due_at <= due_at:
+                return
+            self.__scheduler.cancel(self.__task)
+            self.__task = self.__scheduler.schedule(delay, self.save)
+            self.__due_at = due_at
+
+    def save(self):
+        """
+        Save snapshot if persisted layers (content, dots and blink) changed
+        """
+        with self.__lock:
+            self.__scheduler.cancel(self.__task)
+            self.__task = None
+
+            snapshot = self.__get_snapshot()._replace(saved_at=0.0)
+            if snapshot.kind == KIND_NONE:
+                # not restored content is not saved, so time changes do not trigger writes
+                snapshot = snapshot._replace(expires_at=None, digits=(0,) * DIGITS_COUNT)
+            if snapshot == self.__saved:
+                return
+
+            try:
+                save_snapshot(
+                    self.cleep_filesystem,
+                    self.path,
+                    pack_snapshot(snapshot._replace(saved_at=self.__wall_clock())),
+                )
+                self.__saved = snapshot
+            except Exception:
+                self.logger.warning("Unable to save frame snapshot", exc_info=True)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .segments import DIGITS_COUNT
+
+# segments lit for each step of a digit, from left to right. Each column (left
+# verticals, middle verticals, right verticals) is filled bottom half first
+DIGIT_STEPS = (
+    0b0000000000010000,  # E (lower left)
+    0b0000000000100000,  # F (upper left)
+    0b0001000000000000,  # M (lower middle)
+    0b0000001000000000,  # J (upper middle)
+    0b0000000000000100,  # C (lower right)
+    0b0000000000000010,  # B (upper right)
+)
+GAUGE_LEVELS = DIGITS_COUNT * len(DIGIT_STEPS)
+
+
+def _build_gauge_frames():
+    """
+    Precompute digit bitmasks for each gauge level
+
+    Returns:
+        tuple: tuple of GAUGE_LEVELS + 1 frames (4 digit bitmasks each)
+    """
+    frames = []
+    for level in range(GAUGE_LEVELS + 1):
+        frame = []
+        for digit in range(DIGITS_COUNT):
+            steps = min(max(level - digit * len(DIGIT_STEPS), 0), len(DIGIT_STEPS))
+            bitmask = 0
+            for step in DIGIT_STEPS[:steps]:
+                bitmask |= step
+            frame.append(bitmask)
+        frames.append(tuple(frame))
+    return tuple(frames)
+
+
+GAUGE_FRAMES = _build_gauge_frames()
+
+
+def get_gauge_level(value, minimum, maximum):
+    """
+    Quantize value to gauge level
+
+    Args:
+        value (float): value to display
+        minimum (float): value displayed as empty gauge
+        maximum (float): value displayed as full gauge
+
+    Returns:
+        int: gauge level (0..GAUGE_LEVELS)
+    """
+    if maximum == minimum:
+        return GAUGE_LEVELS if value >= maximum else 0
+    level = round((value - minimum) * GAUGE_LEVELS / (maximum - minimum))
+    return min(max(level, 0), GAUGE_LEVELS)
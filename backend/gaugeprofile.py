@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.rendererprofile import RendererProfile
+
+
+class GaugeProfile(RendererProfile):
+    """
+    Gauge profile: value displayed as bar-graph between minimum and maximum
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        RendererProfile.__init__(self)
+        self.value = None
+        self.minimum = 0
+        self.maximum = 100
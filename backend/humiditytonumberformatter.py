@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.profileformatter import ProfileFormatter
+from .numberprofile import NumberProfile
+
+
+class HumidityToNumberFormatter(ProfileFormatter):
+    """
+    sensors.humidity.update event to number profile formatter
+    """
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): formatter parameters
+        """
+        ProfileFormatter.__init__(
+            self, params, "sensors.humidity.update", NumberProfile()
+        )
+
+    def _fill_profile(self, event_params, profile):
+        """
+        Fill profile with event values
+        """
+        profile.value = event_params["humidity"]
+        profile.decimals = 0
+        profile.unit = "%"
+
+        return profile
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import threading
+import time
+
+
+class LoadMonitor:
+    """
+    Monitor application scheduling lag and system load to compute a degradation level
+
+    Level rises as soon as lag or load exceeds its threshold (twice the threshold for
+    minimal level) and goes down one level at a time when host is back below a lower
+    threshold, to avoid flapping.
+
+    Checks only run while degradable work is active: first one as soon as activity is
+    notified, next ones every check interval until activity stops, so an idle display
+    never wakes up for monitoring.
+    """
+
+    LEVEL_NORMAL = 0
+    LEVEL_REDUCED = 1
+    LEVEL_MINIMAL = 2
+
+    # min delay (in seconds) between non-critical redraws for each level
+    REDRAW_PERIODS = {
+        LEVEL_NORMAL: 0.0,
+        LEVEL_REDUCED: 1.0,
+        LEVEL_MINIMAL: 5.0,
+    }
+    # delay (in seconds) between checks
+    CHECK_INTERVAL = 5.0
+    # level goes down when pressure is below this ratio of level threshold
+    RECOVERY_RATIO = 0.7
+
+    def __init__(
+        self,
+        scheduler,
+        logger=None,
+        on_change=None,
+        is_active=None,
+        getloadavg=os.getloadavg,
+        clock=time.monotonic,
+    ):
+        """
+        Constructor
+
+        Args:
+            scheduler (Scheduler): scheduler instance (checks and lag source)
+            logger (Logger): logger instance
+            on_change (function): function called with new level when level changes
+            is_active (function): function returning True while degradable work is pending
+            getloadavg (function): system load average function
+            clock (function): monotonic clock function
+        """
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.__scheduler = scheduler
+        self.__on_change = on_change
+        self.__is_active = is_active
+        self.__getloadavg = getloadavg
+        self.__clock = clock
+        self.__cpu_count = os.cpu_count() or 1
+        self.__lock = threading.Lock()
+        self.__task = None
+        self.__active_at = None
+        self.__lag_threshold = 0.1
+        self.__load_threshold = 1.5
+        self.level = self.LEVEL_NORMAL
+        self.load = 0.0
+        self.changes = 0
+        self.postponed = 0
+
+    def set_thresholds(self, lag_threshold, load_threshold):
+        """
+        Set thresholds above which rendering is degraded
+
+        Args:
+            lag_threshold (float): scheduling lag threshold (seconds)
+            load_threshold (float): 1 minute load average threshold (per cpu)
+        """
+        self.__lag_threshold = lag_threshold
+        self.__load_threshold = load_threshold
+
+    def notify_activity(self):
+        """
+        Notify degradable work occured (non-critical redraw, running timer).
+        Checks are started if they are not running
+        """
+        with self.__lock:
+            self.__active_at = self.__clock()
+            if self.__task is None:
+                self.__task = self.__scheduler.schedule(0.0, self.__run_check)
+
+    def get_redraw_period(self):
+        """
+        Return min delay between non-critical redraws for current level
+
+        Returns:
+            float: delay in seconds (0 means no delay)
+        """
+        return self.REDRAW_PERIODS[self.level]
+
+    def get_infos(self):
+        """
+        Return monitor infos
+
+        Returns:
+            dict: monitor infos::
+
+                {
+                    level (int): current degradation level
+                    changes (int): number of level changes
+                    postponed (int): number of postponed redraws
+                    lag (float): smoothed scheduling lag (ms)
+                    load (float): last 1 minute load average per cpu
+                }
+
+        """
+        return {
+            "level": self.level,
+            "changes": self.changes,
+            "postponed": self.postponed,
+            "lag": round(self.__scheduler.lag * 1000, 1),
+            "load": round(self.load, 2),
+        }
+
+    def check(self):
+        """
+        Measure lag and load and update degradation level
+
+        Returns:
+            int: degradation level
+        """
+        try:
+            self.load = self.__getloadavg()[0] / self.__cpu_count
+        except OSError:
+            self.load = 0.0
+        pressure = max(
+            self.__scheduler.lag / self.__lag_threshold,
+            self.load / self.__load_threshold,
+        )
+
+        level = min(int(pressure), self.LEVEL_MINIMAL)
+        if level < self.level:
+            level = (
+                self.level - 1
+                if pressure < self.level * self.RECOVERY_RATIO
+                else self.level
+            )
+        if level != self.level:
+            self.logger.info(
+                "Rendering level changed from %s to %s (lag=%.3fs load=%.2f)",
+                self.level,
+                level,
+                self.__scheduler.lag,
+                self.load,
+            )
+            self.level = level
+            self.changes += 1
+            if self.__on_change:
+                self.__on_change(level)
+
+        return self.level
+
+    def __run_check(self):
+        """
+        Scheduled check, next one is scheduled while degradable work is active
+        """
+        self.check()
+
+        with self.__lock:
+            self.__task = None
+            is_active = self.__active_at is not None and (
+                self.__clock() - self.__active_at < self.CHECK_INTERVAL
+            )
+            if is_active or (self.__is_active and self.__is_active()):
+                self.__task = self.__scheduler.schedule(self.CHECK_INTERVAL, self.__run_check)
+
+
+class RedrawThrottle:
+    """
+    Throttle non-critical redraws according to load monitor level
+
+    Redraw is run now, or postponed when host is busy. Only last postponed redraw is
+    kept, intermediate frames are skipped.
+    """
+
+    def __init__(self, scheduler, load_monitor, can_redraw=None, clock=time.monotonic):
+        """
+        Constructor
+
+        Args:
+            scheduler (Scheduler): scheduler instance used for postponed redraws
+            load_monitor (LoadMonitor): load monitor instance
+            can_redraw (function): function returning False when postponed redraw is outdated
+            clock (function): monotonic clock function
+        """
+        self.__scheduler = scheduler
+        self.__load_monitor = load_monitor
+        self.__can_redraw = can_redraw
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__redraw = None
+        self.__task = None
+        self.__last_redraw = 0.0
+
+    def redraw(self, redraw, *args):
+        """
+        Run redraw now or postpone it
+
+        Args:
+            redraw (function): redraw function
+            args (tuple): redraw function arguments
+        """
+        self.__load_monitor.notify_activity()
+        with self.__lock:
+            wait = self.__last_redraw + self.__load_monitor.get_redraw_period() - self.__clock()
+            if wait > 0 or self.__task is not None:
+                self.__load_monitor.postponed += 1
+                self.__redraw = (redraw, args)
+                if self.__task is None:
+                    self.__task = self.__scheduler.schedule(wait, self.__run_postponed)
+                return
+            self.__last_redraw = self.__clock()
+
+        redraw(*args)
+
+    def drop(self):
+        """
+        Drop postponed redraw, it is outdated by a priority redraw
+        """
+        with self.__lock:
+            self.__scheduler.cancel(self.__task)
+            self.__task = None
+            self.__redraw = None
+
+    def is_pending(self):
+        """
+        Return True if a redraw is postponed
+
+        Returns:
+            bool: True if a redraw is postponed
+        """
+        return self.__task is not None
+
+    def __run_postponed(self):
+        """
+        Run postponed redraw
+        """
+        with self.__lock:
+            postponed = self.__redraw
+            self.__redraw = None
+            self.__task = None
+            if postponed is None or (self.__can_redraw and not self.__can_redraw()):
+                return
+            self.__last_redraw = self.__clock()
+
+        redraw, args = postponed
+        redraw(*args)
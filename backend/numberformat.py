@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+from functools import lru_cache
+from .segments import DIGITS_COUNT, encode_text
+
+# max unit length, at least 2 digits must remain for value
+MAX_UNIT_LENGTH = DIGITS_COUNT - 2
+
+
+@lru_cache(maxsize=512)
+def format_number(value, decimals=0, unit=""):
+    """
+    Format number to fit on 4 digits. Decimals are reduced when value is too wide,
+    and dot is not counted as digit because it is displayed with decimal point
+    (21.5 with unit "C" gives "21.5C").
+
+    Too large values are displayed as "Hi" (or "Lo" for negative ones).
+
+    Args:
+        value (float): value to format
+        decimals (int): max number of decimals
+        unit (str): unit displayed after value (2 chars max)
+
+    Returns:
+        str: formatted value
+    """
+    width = DIGITS_COUNT - len(unit)
+    if math.isnan(value):
+        return "-" * width + unit
+
+    if not math.isinf(value):
+        for places in range(decimals, -1, -1):
+            text = f"{value:.{places}f}"
+            if float(text) == 0:
+                # do not display "-0.0"
+                text = text.lstrip("-")
+            if len(text) - text.count(".") <= width:
+                return text + unit
+
+    return ("Lo" if value < 0 else "Hi") + unit
+
+
+@lru_cache(maxsize=512)
+def encode_number(value, decimals=0, unit=""):
+    """
+    Encode number to digit bitmasks
+
+    Args:
+        value (float): value to encode
+        decimals (int): max number of decimals
+        unit (str): unit displayed after value (2 chars max)
+
+    Returns:
+        tuple: 4 digit bitmasks (including decimal point)
+    """
+    return encode_text(format_number(value, decimals, unit))
+
+
+@lru_cache(maxsize=1440)
+def format_clock(hour, minute):
+    """
+    Format time as HHMM
+
+    Args:
+        hour (int): hour
+        minute (int): minute
+
+    Returns:
+        str: formatted time
+    """
+    return f"{hour:02d}{minute:02d}"
@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.rendererprofile import RendererProfile
+
+
+class NumberProfile(RendererProfile):
+    """
+    Number profile: value fitted on display with max number of decimals and unit
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        RendererProfile.__init__(self)
+        self.value = None
+        self.decimals = 0
+        self.unit = ""
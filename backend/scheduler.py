@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+class ScheduledTask:
+    """
+    Task registered in scheduler
+    """
+
+    def __init__(self, deadline, callback, args):
+        """
+        Constructor
+
+        Args:
+            deadline (float): monotonic time when task must run
+            callback (function): function to call
+            args (tuple): callback arguments
+        """
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    Single thread scheduler for all time-based work of the application
+
+    Tasks are stored in a heap ordered by deadline. Thread sleeps until next
+    deadline and all tasks due in the same tick are run during a single wake-up.
+    When no task is pending, thread waits without timeout (no wake-up at all).
+
+    Scheduler can also be created without thread, due tasks are then run by caller
+    with run_pending (used to replay traffic with a virtual clock).
+    """
+
+    # tasks due within this delay (in seconds) are run during the same wake-up
+    TICK = 0.01
+    # weight of last measured lag in smoothed lag
+    LAG_WEIGHT = 0.25
+
+    def __init__(self, logger=None, clock=time.monotonic, threaded=True):
+        """
+        Constructor
+
+        Args:
+            logger (Logger): logger instance
+            clock (function): monotonic clock function
+            threaded (bool): run tasks in scheduler thread (True) or in run_pending caller (False)
+        """
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.__clock = clock
+        self.__threaded = threaded
+        self.__heap = []
+        self.__sequence = itertools.count()
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__running = False
+        self.__stopped = False
+        self.wakeups = 0
+        # smoothed delay (in seconds) between task deadline and task execution
+        self.lag = 0.0
+
+    def schedule(self, delay, callback, args=()):
+        """
+        Schedule callback execution. Scheduler thread is started if necessary.
+        Callback is dropped once scheduler is stopped.
+
+        Args:
+            delay (float): delay in seconds before running callback
+            callback (function): function to call
+            args (tuple): callback arguments
+
+        Returns:
+            ScheduledTask: scheduled task that can be cancelled
+        """
+        task = ScheduledTask(self.__clock() + max(0.0, delay), callback, args)
+        with self.__condition:
+            if self.__stopped:
+                self.logger.debug("Scheduler is stopped, task %s is dropped", callback)
+                task.cancelled = True
+                return task
+            is_first = not self.__heap or task.deadline < self.__heap[0][0]
+            heapq.heappush(self.__heap, (task.deadline, next(self.__sequence), task))
+            self.__start_thread()
+            if is_first:
+                # thread must recompute its sleep duration
+                self.__condition.notify()
+
+        return task
+
+    def cancel(self, task):
+        """
+        Cancel scheduled task. Nothing happens if task already ran
+
+        Args:
+            task (ScheduledTask): task to cancel
+        """
+        if task is None:
+            return
+
+        with self.__condition:
+            task.cancelled = True
+            for index, entry in enumerate(self.__heap):
+                if entry[2] is task:
+                    # heap is small, rebuilding it is cheaper than keeping dead entries
+                    self.__heap.pop(index)
+                    heapq.heapify(self.__heap)
+                    break
+
+    def get_pending_count(self):
+        """
+        Return number of pending tasks
+
+        Returns:
+            int: number of pending tasks
+        """
+        with self.__condition:
+            return len(self.__heap)
+
+    def get_next_deadline(self):
+        """
+        Return deadline of next pending task
+
+        Returns:
+            float: monotonic time of next deadline or None if no task is pending
+        """
+        with self.__condition:
+            return self.__heap[0][0] if self.__heap else None
+
+    def run_pending(self):
+        """
+        Run due tasks in caller thread. Only for scheduler created without thread
+
+        Returns:
+            int: number of run tasks
+        """
+        with self.__condition:
+            tasks = self.__pop_due_tasks()
+            if tasks:
+                self.wakeups += 1
+
+        return self.__run_tasks(tasks)
+
+    def stop(self):
+        """
+        Stop scheduler thread. Pending tasks are dropped and new ones are refused
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__running = False
+            self.__heap.clear()
+            self.__condition.notify()
+            thread = self.__thread
+            self.__thread = None
+
+        if thread and thread is not threading.current_thread():
+            thread.join()
+
+    def __start_thread(self):
+        """
+        Start scheduler thread if not running. Must be called with condition acquired
+        """
+        if self.__thread is not None or not self.__threaded:
+            return
+
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name="fourletterdisplay-scheduler")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __pop_due_tasks(self):
+        """
+        Pop tasks due in current tick. Must be called with condition acquired
+
+        Returns:
+            list: list of due tasks
+        """
+        limit = self.__clock() + self.TICK
+        tasks = []
+        while self.__heap and self.__heap[0][0] <= limit:
+            tasks.append(heapq.heappop(self.__heap)[2])
+        return tasks
+
+    def __run(self):
+        """
+        Scheduler thread loop
+        """
+        while True:
+            with self.__condition:
+                tasks = self.__pop_due_tasks()
+                while self.__running and not tasks:
+                    timeout = self.__heap[0][0] - self.__clock() if self.__heap else None
+                    self.__condition.wait(timeout)
+                    tasks = self.__pop_due_tasks()
+                if not self.__running:
+                    return
+                self.wakeups += 1
+
+            self.__run_tasks(tasks)
+
+    def __run_tasks(self, tasks):
+        """
+        Run tasks that were not cancelled and update lag
+
+        Args:
+            tasks (list): list of due tasks
+
+        Returns:
+            int: number of run tasks
+        """
+        count = 0
+        for task in tasks:
+            if task.cancelled:
+                continue
+            lag = max(0.0, self.__clock() - task.deadline)
+            self.lag += (lag - self.lag) * self.LAG_WEIGHT
+            count += 1
+            try:
+                task.callback(*task.args)
+            except Exception:
+                self.logger.exception("Scheduled task %s failed", task.callback)
+
+        return count
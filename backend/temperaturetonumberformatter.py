@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.profileformatter import ProfileFormatter
+from .numberprofile import NumberProfile
+
+
+class TemperatureToNumberFormatter(ProfileFormatter):
+    """
+    sensors.temperature.update event to number profile formatter
+    """
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): formatter parameters
+        """
+        ProfileFormatter.__init__(
+            self, params, "sensors.temperature.update", NumberProfile()
+        )
+
+    def _fill_profile(self, event_params, profile):
+        """
+        Fill profile with event values
+        """
+        profile.value = event_params["celsius"]
+        profile.decimals = 1
+        profile.unit = "C"
+
+        return profile
@@ -3,6 +3,7 @@
 
 from cleep.libs.internals.profileformatter import ProfileFormatter
 from cleep.profiles.messageprofile import MessageProfile
+from .numberformat import format_clock
 
 
 class TimeToMessageFormatter(ProfileFormatter):
@@ -23,6 +24,6 @@ class TimeToMessageFormatter(ProfileFormatter):
         """
         Fill profile with event values
         """
-        profile.message = f"{event_params['hour']:02d}{event_params['minute']:02d}"
+        profile.message = format_clock(event_params["hour"], event_params["minute"])
 
         return profile
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import threading
+import time
+
+
+class TrafficRecorder:
+    """
+    Record traffic reaching the application (renders, events and commands) with its
+    timing in a compact trace file, to replay it offline.
+
+    Trace file is a gzipped file with one json array per line::
+
+        [offset (seconds since recording start), kind, name, arguments]
+
+    First line is a start record holding recording start timestamp, so wall clock
+    time of each record (sunrise and sunset comparisons) can be rebuilt on replay.
+    """
+
+    KIND_START = "start"
+    KIND_RENDER = "render"
+    KIND_EVENT = "event"
+    KIND_COMMAND = "command"
+
+    # recording is automatically stopped after this number of records
+    MAX_RECORDS = 1000000
+
+    def __init__(self, clock=time.monotonic, wall_clock=time.time):
+        """
+        Constructor
+
+        Args:
+            clock (function): monotonic clock function
+            wall_clock (function): wall clock function (timestamp)
+        """
+        self.__clock = clock
+        self.__wall_clock = wall_clock
+        self.__lock = threading.Lock()
+        self.__file = None
+        self.__started_at = None
+        self.path = None
+        self.records = 0
+
+    def is_recording(self):
+        """
+        Return recording status
+
+        Returns:
+            bool: True if recording is running
+        """
+        return self.__file is not None
+
+    def start(self, path):
+        """
+        Start recording. Running recording is stopped
+
+        Args:
+            path (str): trace file path
+        """
+        self.stop()
+        with self.__lock:
+            self.__file = gzip.open(path, "wt", encoding="utf-8")
+            self.__started_at = self.__clock()
+            self.path = path
+            self.records = 0
+            start = [0.0, self.KIND_START, "trace", {"time": self.__wall_clock()}]
+            self.__file.write(json.dumps(start, separators=(",", ":")) + "\n")
+
+    def stop(self):
+        """
+        Stop recording
+
+        Returns:
+            dict: recording infos::
+
+                {
+                    path (str): trace file path
+                    records (int): number of records
+                }
+
+        """
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+            return {"path": self.path, "records": self.records}
+
+    def record_render(self, profile_name, profile_values):
+        """
+        Record render call
+
+        Args:
+            profile_name (str): rendered profile name
+            profile_values (dict): profile values
+        """
+        self.__record(self.KIND_RENDER, profile_name, profile_values)
+
+    def record_event(self, event):
+        """
+        Record received event
+
+        Args:
+            event (dict): event as received by on_event
+        """
+        self.__record(self.KIND_EVENT, event["event"], event.get("params"))
+
+    def record_command(self, command, **params):
+        """
+        Record command call
+
+        Args:
+            command (str): command name
+            params (dict): command parameters
+        """
+        self.__record(self.KIND_COMMAND, command, params)
+
+    def __record(self, kind, name, args):
+        """
+        Write record to trace file
+        """
+        if self.__file is None:
+            return
+
+        offset = round(self.__clock() - self.__started_at, 4)
+        line = json.dumps([offset, kind, name, args], separators=(",", ":"), default=str)
+        with self.__lock:
+            if self.__file is None:
+                return
+            self.__file.write(line + "\n")
+            self.records += 1
+            if self.records >= self.MAX_RECORDS:
+                self.__file.close()
+                self.__file = None
+
+
+def read_trace(path):
+    """
+    Read trace file
+
+    Args:
+        path (str): trace file path
+
+    Returns:
+        generator: generator of records (offset, kind, name, args)
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as trace:
+        for line in trace:
+            if line.strip():
+                yield tuple(json.loads(line))
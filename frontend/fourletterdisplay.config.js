@@ -4,8 +4,8 @@
  */
 angular
 .module('Cleep')
-.directive('fourletterdisplayConfigComponent', ['$rootScope', 'cleepService', 'fourletterdisplayService',
-function($rootScope, cleepService, fourletterdisplayService) {
+.directive('fourletterdisplayConfigComponent', ['fourletterdisplayService',
+function(fourletterdisplayService) {
 
     var fourletterdisplayConfigController = function() {
         var self = this;
@@ -18,57 +18,103 @@ function($rootScope, cleepService, fourletterdisplayService) {
             { label: 'right dot', value: 3 },
         ];
         self.selectedDots = [];
+        self.state = {};
+        self.stateVersion = null;
+
+        /**
+         * Sync display state, state is only transferred when it changed
+         */
+        self.syncState = function() {
+            return fourletterdisplayService.getState(self.stateVersion)
+                .then(function(resp) {
+                    if(resp.error || resp.data.unchanged) {
+                        return;
+                    }
+                    self.stateVersion = resp.data.version;
+                    self.state = resp.data;
+                    Object.assign(self.config, resp.data.config);
+                });
+        };
+
+        /**
+         * Format dots states for status section
+         */
+        self.formatDots = function(dots) {
+            if(!dots) {
+                return '-';
+            }
+            return dots.map((dot) => dot ? 'on' : 'off').join(' / ');
+        };
+
+        /**
+         * Format running timer for status section
+         */
+        self.formatTimer = function(timer) {
+            if(!timer) {
+                return 'None';
+            }
+            const elapsed = Math.floor(timer.elapsed) + 's';
+            return timer.mode === 'countdown'
+                ? 'Countdown ' + elapsed + ' / ' + timer.duration + 's'
+                : 'Stopwatch ' + elapsed;
+        };
 
         self.displayMessage = function() {
-            fourletterdisplayService.displayMessage(self.message);
+            fourletterdisplayService.displayMessage(self.message)
+                .then(function(resp) {
+                    self.syncState();
+                });
             self.message = '';
         };
 
         self.setDots = function(value) {
             const dots = new Array(4).fill(false);
             value.forEach((dot) => dots[dot] = true);
-            fourletterdisplayService.setDots(dots[0], dots[1], dots[2], dots[3]);
+            fourletterdisplayService.setDots(dots[0], dots[1], dots[2], dots[3])
+                .then(function(resp) {
+                    self.syncState();
+                });
         };
 
         self.enableNightMode = function(value) {
             fourletterdisplayService.enableNightMode(value)
                 .then(function(resp) {
-                    cleepService.reloadModuleConfig('fourletterdisplay')
+                    self.syncState();
                 });
         };
 
         self.setBrightness = function(value) {
             fourletterdisplayService.setBrightness(value)
                 .then(function(resp) {
-                    cleepService.reloadModuleConfig('fourletterdisplay')
+                    self.syncState();
                 });
         };
 
         self.setNightModeBrightness = function(value) {
             fourletterdisplayService.setNightModeBrightness(value)
                 .then(function(resp) {
-                    cleepService.reloadModuleConfig('fourletterdisplay');
+                    self.syncState();
+                });
+        };
+
+        self.enableIsolatedIo = function(value) {
+            fourletterdisplayService.enableIsolatedIo(value)
+                .then(function(resp) {
+                    self.syncState();
                 });
         };
 
         self.clearDisplay = function() {
-            fourletterdisplayService.clear();
+            fourletterdisplayService.clear()
+                .then(function(resp) {
+                    self.syncState();
+                });
         };
 
         self.$onInit = function() {
-            cleepService.getModuleConfig('fourletterdisplay');
+            // config is part of display state
+            self.syncState();
         };
-
-        /**
-         * Keep app configuration in sync
-         */
-        $rootScope.$watch(function() {
-            return cleepService.modules['fourletterdisplay'].config;
-        }, function(newVal, oldVal) {
-            if(newVal && Object.keys(newVal).length) {
-                Object.assign(self.config, newVal);
-            }
-        });
     };
 
     return {
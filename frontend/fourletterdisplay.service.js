@@ -37,6 +37,28 @@ function($rootScope, rpcService) {
         });
     };
 
+    /**
+     * Display gauge
+     */
+    self.displayGauge = function(value, minimum, maximum) {
+        return rpcService.sendCommand('display_gauge', 'fourletterdisplay', {
+            'value': value,
+            'minimum': minimum,
+            'maximum': maximum,
+        });
+    };
+
+    /**
+     * Display number
+     */
+    self.displayNumber = function(value, decimals, unit) {
+        return rpcService.sendCommand('display_number', 'fourletterdisplay', {
+            'value': value,
+            'decimals': decimals,
+            'unit': unit,
+        });
+    };
+
     /**
      * Set dots
      */
@@ -49,6 +71,52 @@ function($rootScope, rpcService) {
         });
     };
 
+    /**
+     * Set blink period (0 to disable blinking)
+     */
+    self.setBlink = function(period) {
+        return rpcService.sendCommand('set_blink', 'fourletterdisplay', {
+            'period': period
+        });
+    };
+
+    /**
+     * Start countdown
+     */
+    self.startCountdown = function(duration) {
+        return rpcService.sendCommand('start_countdown', 'fourletterdisplay', {
+            'duration': duration
+        });
+    };
+
+    /**
+     * Start stopwatch
+     */
+    self.startStopwatch = function() {
+        return rpcService.sendCommand('start_stopwatch', 'fourletterdisplay');
+    };
+
+    /**
+     * Stop countdown or stopwatch
+     */
+    self.stopTimer = function() {
+        return rpcService.sendCommand('stop_timer', 'fourletterdisplay');
+    };
+
+    /**
+     * Start render traffic recording
+     */
+    self.startRecording = function() {
+        return rpcService.sendCommand('start_recording', 'fourletterdisplay');
+    };
+
+    /**
+     * Stop render traffic recording
+     */
+    self.stopRecording = function() {
+        return rpcService.sendCommand('stop_recording', 'fourletterdisplay');
+    };
+
     /**
      * Enable night mode
      */
@@ -58,6 +126,35 @@ function($rootScope, rpcService) {
         });
     };
 
+    /**
+     * Enable isolated I/O
+     */
+    self.enableIsolatedIo = function(enable) {
+        return rpcService.sendCommand('enable_isolated_io', 'fourletterdisplay', {
+            'enable': enable
+        });
+    };
+
+    /**
+     * Get display state. Only state version is returned if state did not change
+     * since specified version
+     */
+    self.getState = function(version) {
+        return rpcService.sendCommand('get_state', 'fourletterdisplay', {
+            'version': version
+        });
+    };
+
+    /**
+     * Set thresholds above which rendering is degraded
+     */
+    self.setLoadThresholds = function(lagThreshold, loadThreshold) {
+        return rpcService.sendCommand('set_load_thresholds', 'fourletterdisplay', {
+            'lag_threshold': lagThreshold,
+            'load_threshold': loadThreshold,
+        });
+    };
+
     /**
      * Clear display
      */
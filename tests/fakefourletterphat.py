@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from backend.segments import DIGIT_VALUES, DECIMAL_MASK, encode_text
+
+
+class FakeFourLetterPHat:
+    """
+    In-memory stand-in for fourletterphat lib. It mimics lib buffer handling and
+    records what is written on the I2C bus, so frames really displayed on glass can
+    be compared to what the application was asked to display.
+    """
+
+    HT16K33_BLINK_OFF = 0x00
+    HT16K33_BLINK_2HZ = 0x02
+    HT16K33_BLINK_1HZ = 0x04
+    HT16K33_BLINK_HALFHZ = 0x06
+
+    # bytes sent on bus by a display ram write (command + 16 bytes of ram)
+    SHOW_BYTES = 17
+    # bytes sent on bus by a single command (brightness, blink)
+    COMMAND_BYTES = 1
+
+    def __init__(self, write_delay=0.0):
+        """
+        Constructor
+
+        Args:
+            write_delay (float): simulated duration of a bus transaction (in seconds)
+        """
+        self.write_delay = write_delay
+        self.__lock = threading.Lock()
+        self.buffer = [0, 0, 0, 0]
+        self.glass = (0, 0, 0, 0)
+        self.brightness = 15
+        self.blink = FakeFourLetterPHat.HT16K33_BLINK_OFF
+        self.flushes = 0
+        self.commands = 0
+        self.bytes_written = 0
+
+    def __bus_write(self, size):
+        """
+        Simulate a bus transaction
+        """
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        self.bytes_written += size
+
+    def set_digit_raw(self, pos, bitmask):
+        if 0 <= pos <= 3:
+            self.buffer[pos] = bitmask & 0xFFFF
+
+    def set_decimal(self, pos, decimal):
+        if 0 <= pos <= 3:
+            if decimal:
+                self.buffer[pos] |= DECIMAL_MASK
+            else:
+                self.buffer[pos] &= ~DECIMAL_MASK
+
+    def set_digit(self, pos, digit, decimal=False):
+        self.set_digit_raw(pos, DIGIT_VALUES.get(str(digit), 0x00))
+        if decimal:
+            self.set_decimal(pos, True)
+
+    def print_str(self, value, justify_right=True):
+        value = value.rjust(4, " ") if justify_right else value.ljust(4, " ")
+        for pos, char in enumerate(value):
+            self.set_digit(pos, char)
+
+    def clear(self):
+        self.buffer = [0, 0, 0, 0]
+
+    def show(self):
+        with self.__lock:
+            self.__bus_write(FakeFourLetterPHat.SHOW_BYTES)
+            self.glass = tuple(self.buffer)
+            self.flushes += 1
+
+    def set_brightness(self, brightness):
+        with self.__lock:
+            self.__bus_write(FakeFourLetterPHat.COMMAND_BYTES)
+            self.brightness = brightness
+            self.commands += 1
+
+    def set_blink(self, frequency):
+        with self.__lock:
+            self.__bus_write(FakeFourLetterPHat.COMMAND_BYTES)
+            self.blink = frequency
+            self.commands += 1
+
+    def get_glass_text(self):
+        """
+        Return displayed frame as readable string (unknown chars are replaced by ?)
+
+        Returns:
+            str: displayed text. Dots are appended after digit as "."
+        """
+        reverse = {}
+        for char, value in DIGIT_VALUES.items():
+            if char.isalnum() or value not in reverse:
+                reverse[value] = char
+        text = ""
+        for value in self.glass:
+            text += reverse.get(value & ~DECIMAL_MASK, "?")
+            if value & DECIMAL_MASK:
+                text += "."
+        return text
+
+    @staticmethod
+    def encode(text, dots):
+        """
+        Encode text and dots as they should be displayed on glass
+
+        Args:
+            text (str): 4 chars text
+            dots (list): list of 4 dots states
+
+        Returns:
+            tuple: 4 raw digit values
+        """
+        return tuple(
+            value | (DECIMAL_MASK if dot else 0)
+            for value, dot in zip(encode_text(text), dots)
+        )
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Replay render traffic recorded on a device (see start_recording/stop_recording
+commands) against Fourletterdisplay with an in-memory stand-in of the fourletterphat lib.
+
+It reports display flushes, bytes written on bus, call latency and final frame, so
+costs of different app versions can be compared on real traffic.
+
+Application runs on a virtual clock driven by trace offsets: scheduled work (timer
+ticks, deferred redraws, sunrise and sunset transitions) runs at traced time whatever
+the replay speed, and wall clock starts at recording start time so traced sun schedule
+is compared with traced time. --speed only paces real calls (latency under load).
+Traces recorded before start record was added replay with current time as wall clock,
+sunrise and sunset transitions of those traces are not reliable.
+
+Usage (from tests directory):
+    python3 replay_fourletterdisplay.py fourletterdisplay.trace.gz --speed 10
+    python3 replay_fourletterdisplay.py fourletterdisplay.trace.gz --speed 0 --json report.json
+"""
+from cleep.libs.tests import session
+import argparse
+import json
+import unittest
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.append("../")
+from backend.fourletterdisplay import Fourletterdisplay
+from backend.brightness import BrightnessController
+from backend.displaytimer import DisplayTimer
+from backend.loadmonitor import LoadMonitor, RedrawThrottle
+from backend.scheduler import Scheduler
+from backend.trafficrecorder import TrafficRecorder, read_trace
+from unittest.mock import Mock, patch
+from fakefourletterphat import FakeFourLetterPHat
+from stress_fourletterdisplay import LatencyStats
+
+OPTIONS = argparse.Namespace(
+    trace=None,
+    speed=1.0,
+    write_delay=0.0005,
+    json=None,
+)
+
+
+class VirtualClock:
+    """
+    Clock advanced by replay instead of real time
+    """
+
+    # arbitrary monotonic origin
+    MONOTONIC_ORIGIN = 1000.0
+
+    def __init__(self, wall_origin):
+        self.wall_origin = wall_origin
+        self.offset = 0.0
+
+    def monotonic(self):
+        return self.MONOTONIC_ORIGIN + self.offset
+
+    def time(self):
+        return self.wall_origin + self.offset
+
+    def time_ns(self):
+        return int(self.time() * 1000000000)
+
+    def now(self):
+        return datetime.fromtimestamp(self.time())
+
+
+class ReplayFourletterdisplay(unittest.TestCase):
+    def setUp(self):
+        self.session = session.TestSession(self)
+        logging.basicConfig(
+            level=logging.WARNING,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.lib = FakeFourLetterPHat(write_delay=OPTIONS.write_delay)
+        self.stats = LatencyStats()
+        self.records = list(read_trace(OPTIONS.trace))
+        if self.records and self.records[0][1] == TrafficRecorder.KIND_START:
+            self.clock = VirtualClock(self.records.pop(0)[3]["time"])
+        else:
+            logging.warning("Trace has no start time, sunrise and sunset transitions are not reliable")
+            self.clock = VirtualClock(time.time())
+        self.__patch_clock()
+        snapshot_patcher = patch(
+            "backend.fourletterdisplay.SNAPSHOT_FILE",
+            os.path.join(tempfile.gettempdir(), "fourletterdisplay.replay.snapshot"),
+        )
+        snapshot_patcher.start()
+        self.addCleanup(snapshot_patcher.stop)
+        importlib_patcher = patch("backend.fourletterdisplay.importlib")
+        mock_importlib = importlib_patcher.start()
+        mock_importlib.import_module.return_value = self.lib
+        self.addCleanup(importlib_patcher.stop)
+
+    def tearDown(self):
+        self.session.clean()
+
+    def __patch_clock(self):
+        clock = self.clock
+
+        class VirtualDisplayTimer(DisplayTimer):
+            def __init__(self, mode, duration=None):
+                super().__init__(mode, duration, clock=clock.monotonic)
+
+        patchers = [
+            patch(
+                "backend.fourletterdisplay.Scheduler",
+                lambda logger: Scheduler(logger, clock=clock.monotonic, threaded=False),
+            ),
+            patch(
+                "backend.fourletterdisplay.BrightnessController",
+                lambda *args, **kwargs: BrightnessController(*args, clock=clock.time, **kwargs),
+            ),
+            patch(
+                "backend.fourletterdisplay.LoadMonitor",
+                lambda *args, **kwargs: LoadMonitor(*args, clock=clock.monotonic, **kwargs),
+            ),
+            patch(
+                "backend.fourletterdisplay.RedrawThrottle",
+                lambda *args, **kwargs: RedrawThrottle(*args, clock=clock.monotonic, **kwargs),
+            ),
+            patch("backend.fourletterdisplay.DisplayTimer", VirtualDisplayTimer),
+            patch(
+                "backend.fourletterdisplay.time",
+                SimpleNamespace(
+                    time=clock.time, time_ns=clock.time_ns, monotonic=clock.monotonic
+                ),
+            ),
+            patch("backend.fourletterdisplay.datetime", SimpleNamespace(now=clock.now)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def __advance_clock(self, offset):
+        """
+        Advance virtual clock to offset, running scheduled work at its deadline
+        """
+        scheduler = self.module.scheduler
+        target = VirtualClock.MONOTONIC_ORIGIN + offset
+        while True:
+            deadline = scheduler.get_next_deadline()
+            if deadline is None or deadline > target:
+                break
+            self.clock.offset = max(self.clock.offset, deadline - VirtualClock.MONOTONIC_ORIGIN)
+            scheduler.run_pending()
+        self.clock.offset = max(self.clock.offset, offset)
+
+    def init_session(self):
+        self.config = dict(Fourletterdisplay.DEFAULT_CONFIG)
+        self.module = self.session.setup(
+            Fourletterdisplay, mock_on_start=False, mock_on_stop=False
+        )
+        self.module.driver = Mock()
+        self.module.driver.is_installed.return_value = True
+        self.module._get_config_field = lambda field: self.config.get(field)
+        self.module._set_config_field = self.config.__setitem__
+        self.session.start_module(self.module)
+
+    def __replay_record(self, kind, name, args):
+        if kind == TrafficRecorder.KIND_RENDER:
+            self.module.on_render(name, args)
+        elif kind == TrafficRecorder.KIND_EVENT:
+            self.module.on_event({"event": name, "params": args, "device_id": None})
+        elif kind == TrafficRecorder.KIND_COMMAND:
+            getattr(self.module, name)(**args)
+
+    def test_replay(self):
+        self.init_session()
+        # do not count startup display
+        flushes, commands, bytes_written = (
+            self.lib.flushes,
+            self.lib.commands,
+            self.lib.bytes_written,
+        )
+
+        records = 0
+        started_at = time.monotonic()
+        for offset, kind, name, args in self.records:
+            self.__advance_clock(offset)
+            if OPTIONS.speed > 0:
+                delay = started_at + offset / OPTIONS.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            start = time.perf_counter()
+            try:
+                self.__replay_record(kind, name, args)
+            except Exception:
+                self.stats.add_error()
+                logging.debug("Replay of %s %s failed", kind, name, exc_info=True)
+            self.stats.add(time.perf_counter() - start)
+            records += 1
+        duration = time.monotonic() - started_at
+
+        latency = self.stats.get_summary()
+        report = {
+            "trace": OPTIONS.trace,
+            "speed": OPTIONS.speed,
+            "records": records,
+            "errors": self.stats.errors,
+            "duration": round(duration, 3),
+            "traced_duration": round(self.clock.offset, 3),
+            "flushes": self.lib.flushes - flushes,
+            "commands": self.lib.commands - commands,
+            "bytes": self.lib.bytes_written - bytes_written,
+            "latency": {key: round(value, 3) for key, value in latency.items()},
+            "final_frame": self.lib.get_glass_text(),
+            "final_brightness": self.lib.brightness,
+            "final_blink": self.lib.blink,
+        }
+
+        print("")
+        print("Fourletterdisplay replay report")
+        for key, value in report.items():
+            print(f"  {key}={value}")
+        if OPTIONS.json:
+            with open(OPTIONS.json, "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=2)
+
+        self.assertGreater(records, 0, "Trace is empty")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fourletterdisplay traffic replay")
+    parser.add_argument("trace", help="Trace file recorded on device")
+    parser.add_argument("--speed", type=float, default=OPTIONS.speed, help="Replay speed factor (0 to replay as fast as possible)")
+    parser.add_argument("--write-delay", type=float, default=OPTIONS.write_delay, help="Simulated bus write duration (seconds)")
+    parser.add_argument("--json", default=OPTIONS.json, help="Write report to json file")
+    OPTIONS = parser.parse_args()
+
+    unittest.main(argv=sys.argv[:1])
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Soak and stress harness for Fourletterdisplay renderer
+
+It drives on_render and on_event with a sustained event storm (MessageProfile,
+GaugeProfile, AlarmProfile and time events with sun schedule) while other threads send RPC commands,
+everything against an in-memory stand-in of the fourletterphat lib.
+
+At the end it checks that:
+    - call latency stays bounded (p99 and max)
+    - memory stays flat once warmed up
+    - final on-glass frame matches the last logical request
+
+Usage (from tests directory):
+    python3 stress_fourletterdisplay.py --duration 600 --rate 200 --rpc-threads 4
+"""
+from cleep.libs.tests import session
+import argparse
+import unittest
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.append("../")
+from backend.fourletterdisplay import Fourletterdisplay
+from cleep.profiles.alarmprofile import AlarmProfile
+from unittest.mock import Mock, patch
+from fakefourletterphat import FakeFourLetterPHat
+
+OPTIONS = argparse.Namespace(
+    duration=60.0,
+    rate=100.0,
+    rpc_threads=2,
+    rpc_rate=20.0,
+    write_delay=0.0005,
+    max_p99_latency=20.0,
+    max_latency=250.0,
+    max_memory_growth=256,
+    seed=None,
+)
+
+
+class LatencyStats:
+    """
+    Thread safe latency collector
+
+    Samples are stored in a preallocated histogram so collector memory does not grow
+    with storm duration (it would hide application leaks).
+    """
+
+    RESOLUTION = 0.00005
+    BUCKETS = 20000
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__histogram = [0] * LatencyStats.BUCKETS
+        self.__count = 0
+        self.__max = 0.0
+        self.errors = 0
+
+    def add(self, duration):
+        bucket = min(int(duration / LatencyStats.RESOLUTION), LatencyStats.BUCKETS - 1)
+        with self.__lock:
+            self.__histogram[bucket] += 1
+            self.__count += 1
+            self.__max = max(self.__max, duration)
+
+    def add_error(self):
+        with self.__lock:
+            self.errors += 1
+
+    def __percentile(self, ratio):
+        threshold = self.__count * ratio
+        total = 0
+        for bucket, count in enumerate(self.__histogram):
+            total += count
+            if total >= threshold:
+                return (bucket + 1) * LatencyStats.RESOLUTION
+        return self.__max
+
+    def get_summary(self):
+        with self.__lock:
+            if not self.__count:
+                return {"count": 0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+            return {
+                "count": self.__count,
+                "p50": self.__percentile(0.50) * 1000.0,
+                "p99": self.__percentile(0.99) * 1000.0,
+                "max": self.__max * 1000.0,
+            }
+
+
+class StressFourletterdisplay(unittest.TestCase):
+    def setUp(self):
+        self.session = session.TestSession(self)
+        logging.basicConfig(
+            level=logging.WARNING,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.random = random.Random(OPTIONS.seed)
+        self.lib = FakeFourLetterPHat(write_delay=OPTIONS.write_delay)
+        self.stats = LatencyStats()
+        self.running = threading.Event()
+        # do not restore nor overwrite device snapshot
+        snapshot_patcher = patch(
+            "backend.fourletterdisplay.SNAPSHOT_FILE",
+            os.path.join(tempfile.gettempdir(), "fourletterdisplay.stress.snapshot"),
+        )
+        snapshot_patcher.start()
+        self.addCleanup(snapshot_patcher.stop)
+        importlib_patcher = patch("backend.fourletterdisplay.importlib")
+        mock_importlib = importlib_patcher.start()
+        mock_importlib.import_module.return_value = self.lib
+        self.addCleanup(importlib_patcher.stop)
+
+    def tearDown(self):
+        self.session.clean()
+
+    def init_session(self):
+        self.config = dict(Fourletterdisplay.DEFAULT_CONFIG)
+        self.module = self.session.setup(
+            Fourletterdisplay, mock_on_start=False, mock_on_stop=False
+        )
+        self.module.driver = Mock()
+        self.module.driver.is_installed.return_value = True
+        self.module._get_config_field = lambda field: self.config.get(field)
+        self.module._set_config_field = self.config.__setitem__
+        self.session.start_module(self.module)
+
+    def __timed_call(self, func, *args):
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception:
+            self.stats.add_error()
+            logging.exception("Call to %s failed", func.__name__)
+        self.stats.add(time.perf_counter() - start)
+
+    def __random_event(self):
+        choice = self.random.random()
+        if choice < 0.5:
+            message = f"{self.random.randint(0, 23):02}{self.random.randint(0, 59):02}"
+            return (self.module.on_render, "MessageProfile", {"message": message})
+        if choice < 0.75:
+            values = {"value": self.random.uniform(0, 100), "minimum": 0, "maximum": 100}
+            return (self.module.on_render, "GaugeProfile", values)
+        if choice < 0.9:
+            status = self.random.choice(
+                [
+                    AlarmProfile.STATUS_SCHEDULED,
+                    AlarmProfile.STATUS_UNSCHEDULED,
+                    AlarmProfile.STATUS_TRIGGERED,
+                    AlarmProfile.STATUS_STOPPED,
+                ]
+            )
+            values = {"status": status, "count": self.random.randint(0, 2)}
+            return (self.module.on_render, "AlarmProfile", values)
+        # sun schedule switching between day and night
+        sunrise = time.time() + self.random.choice([-3600, 3600])
+        params = {"hour": 12, "minute": 0, "sunrise": sunrise, "sunset": sunrise + 7200}
+        return (self.module.on_event, {"event": "parameters.time.now", "params": params})
+
+    def __random_command(self):
+        choice = self.random.random()
+        if choice < 0.4:
+            return (self.module.display_message, self.random.choice(["helo", "1234", "abcd"]))
+        if choice < 0.7:
+            dots = [self.random.random() < 0.5 for _ in range(4)]
+            return (self.module.set_dots, *dots)
+        if choice < 0.8:
+            return (self.module.set_brightness, self.random.randint(0, 15))
+        if choice < 0.85:
+            return (self.module.enable_night_mode, self.random.random() < 0.5)
+        if choice < 0.9:
+            return (self.module.start_countdown, self.random.randint(1, 5))
+        if choice < 0.95:
+            return (self.module.start_stopwatch,)
+        return (self.module.stop_timer,)
+
+    def __run_at_rate(self, rate, generator):
+        interval = 1.0 / rate
+        next_call = time.monotonic()
+        while self.running.is_set():
+            call = generator()
+            self.__timed_call(*call)
+            next_call += interval
+            delay = next_call - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # do not try to catch up lost calls, it would turn into a busy loop
+                next_call = time.monotonic()
+
+    def test_stress(self):
+        self.init_session()
+        tracemalloc.start()
+
+        threads = [
+            threading.Thread(
+                target=self.__run_at_rate, args=(OPTIONS.rate, self.__random_event)
+            )
+        ]
+        for _ in range(OPTIONS.rpc_threads):
+            threads.append(
+                threading.Thread(
+                    target=self.__run_at_rate,
+                    args=(OPTIONS.rpc_rate, self.__random_command),
+                )
+            )
+
+        self.running.set()
+        for thread in threads:
+            thread.start()
+
+        # memory reference is taken after warmup to ignore caches and lazy imports
+        time.sleep(OPTIONS.duration * 0.1)
+        memory_start = tracemalloc.get_traced_memory()[0]
+        time.sleep(OPTIONS.duration * 0.9)
+        memory_end = tracemalloc.get_traced_memory()[0]
+
+        self.running.clear()
+        for thread in threads:
+            thread.join()
+        tracemalloc.stop()
+
+        # last logical request, sent once storm is over
+        self.module.stop_timer()
+        self.module.set_dots(most_left=False, middle_right=False)
+        self.module.on_render("MessageProfile", {"message": "1234"})
+        self.module.on_render(
+            "AlarmProfile", {"status": AlarmProfile.STATUS_SCHEDULED, "count": 1}
+        )
+        expected_frame = FakeFourLetterPHat.encode("1234", [False, True, False, True])
+
+        latency = self.stats.get_summary()
+        memory_growth = (memory_end - memory_start) / 1024.0
+        checks = [
+            ("no call error", self.stats.errors == 0, f"{self.stats.errors} errors"),
+            (
+                "p99 latency",
+                latency["p99"] <= OPTIONS.max_p99_latency,
+                f"{latency['p99']:.2f}ms (max {OPTIONS.max_p99_latency}ms)",
+            ),
+            (
+                "max latency",
+                latency["max"] <= OPTIONS.max_latency,
+                f"{latency['max']:.2f}ms (max {OPTIONS.max_latency}ms)",
+            ),
+            (
+                "memory growth",
+                memory_growth <= OPTIONS.max_memory_growth,
+                f"{memory_growth:.1f}KiB (max {OPTIONS.max_memory_growth}KiB)",
+            ),
+            (
+                "final frame",
+                self.lib.glass == expected_frame,
+                f"'{self.lib.get_glass_text()}' (expected '12.34.')",
+            ),
+            (
+                "brightness",
+                self.lib.brightness == self.config["currentbrightness"],
+                f"{self.lib.brightness} (stored {self.config['currentbrightness']})",
+            ),
+        ]
+
+        report = [
+            "",
+            "Fourletterdisplay stress report",
+            f"  duration={OPTIONS.duration}s rate={OPTIONS.rate}/s "
+            f"rpc_threads={OPTIONS.rpc_threads} rpc_rate={OPTIONS.rpc_rate}/s",
+            f"  calls={latency['count']} p50={latency['p50']:.2f}ms",
+            f"  flushes={self.lib.flushes} commands={self.lib.commands} "
+            f"bytes={self.lib.bytes_written}",
+        ]
+        for name, passed, details in checks:
+            report.append(f"  [{'PASS' if passed else 'FAIL'}] {name}: {details}")
+        print("\n".join(report))
+
+        failed = [name for name, passed, _ in checks if not passed]
+        self.assertEqual(failed, [], "Stress checks failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fourletterdisplay stress harness")
+    parser.add_argument("--duration", type=float, default=OPTIONS.duration, help="Storm duration (seconds)")
+    parser.add_argument("--rate", type=float, default=OPTIONS.rate, help="Render/events per second")
+    parser.add_argument("--rpc-threads", type=int, default=OPTIONS.rpc_threads, help="Concurrent RPC threads")
+    parser.add_argument("--rpc-rate", type=float, default=OPTIONS.rpc_rate, help="RPC commands per second per thread")
+    parser.add_argument("--write-delay", type=float, default=OPTIONS.write_delay, help="Simulated bus write duration (seconds)")
+    parser.add_argument("--max-p99-latency", type=float, default=OPTIONS.max_p99_latency, help="Max p99 latency (ms)")
+    parser.add_argument("--max-latency", type=float, default=OPTIONS.max_latency, help="Max latency (ms)")
+    parser.add_argument("--max-memory-growth", type=float, default=OPTIONS.max_memory_growth, help="Max memory growth (KiB)")
+    parser.add_argument("--seed", type=int, default=OPTIONS.seed, help="Random seed")
+    OPTIONS = parser.parse_args()
+
+    unittest.main(argv=sys.argv[:1])
@@ -3,13 +3,48 @@
 from cleep.libs.tests import session, lib
 import unittest
 import logging
+import os
 import sys
+import tempfile
+import threading
 import time
 from datetime import datetime
 
 sys.path.append("../")
 from backend.fourletterdisplay import Fourletterdisplay
 from backend.fourletterphatdriver import FourLetterPHatDriver
+from backend.framebuffer import FrameBuffer
+from backend.displaytimer import DisplayTimer
+from backend.scheduler import Scheduler
+from backend.loadmonitor import LoadMonitor, RedrawThrottle
+from backend.brightness import BrightnessController, DAY_DURATION
+from backend.framesnapshot import (
+    FrameSnapshot,
+    SnapshotStore,
+    KIND_NONE,
+    KIND_MESSAGE,
+    KIND_VALUE,
+    pack_snapshot,
+    unpack_snapshot,
+    save_snapshot,
+    load_snapshot,
+)
+from backend.segments import DIGIT_VALUES, DECIMAL_MASK
+from backend.gauge import GAUGE_FRAMES, GAUGE_LEVELS, get_gauge_level
+from backend.segments import encode_text
+from backend.numberformat import format_number, encode_number, format_clock
+from backend.trafficrecorder import TrafficRecorder, read_trace
+from backend.displayprocess import (
+    DisplayProcess,
+    apply_shared_state,
+    read_shared_state,
+    SHARED_SIZE,
+    SHARED_SEQUENCE,
+    SHARED_DIGITS,
+    SHARED_BRIGHTNESS,
+    SHARED_BLINK,
+    UNSET,
+)
 from cleep.exception import (
     InvalidParameter,
     MissingParameter,
@@ -26,9 +61,23 @@ mock_importlib = Mock()
 mock_lib = Mock()
 mock_importlib.import_module.return_value = mock_lib
 
+SNAPSHOT_FILE = os.path.join(tempfile.gettempdir(), "fourletterdisplay.test.snapshot")
+
+
+def make_cleep_filesystem():
+    """
+    Cleep filesystem mock writing to real files
+    """
+    cleep_filesystem = Mock()
+    cleep_filesystem.open.side_effect = open
+    cleep_filesystem.close.side_effect = lambda fd: fd.close()
+    cleep_filesystem.rename.side_effect = os.replace
+    return cleep_filesystem
+
 
 @patch("backend.fourletterdisplay.importlib", mock_importlib)
 @patch("backend.fourletterdisplay.FOUR_LETTER_PHAT", mock_lib)
+@patch("backend.fourletterdisplay.SNAPSHOT_FILE", SNAPSHOT_FILE)
 class TestsFourletterdisplay(unittest.TestCase):
     def setUp(self):
         self.session = session.TestSession(self)
@@ -41,9 +90,12 @@ class TestsFourletterdisplay(unittest.TestCase):
         self.session.clean()
         mock_lib.reset_mock()
         mock_importlib.reset_mock()
+        if os.path.exists(SNAPSHOT_FILE):
+            os.remove(SNAPSHOT_FILE)
 
     def init_session(self, start=True, mock_on_start=True, mock_on_stop=True):
         self.module = self.session.setup(Fourletterdisplay, mock_on_start=mock_on_start, mock_on_stop=mock_on_stop)
+        self.module.snapshot_store.cleep_filesystem = make_cleep_filesystem()
         get_time_command = self.session.make_mock_command(
             "get_time", {"hour": 12, "minute": 12}, False, False
         )
@@ -60,13 +112,17 @@ class TestsFourletterdisplay(unittest.TestCase):
     def test_on_start(self, mock_datetime):
         mock_datetime.now.return_value = datetime(2022, 12, 18, 7, 6, 22, 0)
         self.init_session(mock_on_start=False)
-        self.module._get_config_field = Mock()
+        self.module._get_config_field = Mock(
+            side_effect=lambda field: Fourletterdisplay.DEFAULT_CONFIG[field]
+        )
 
         self.module._on_start()
 
         self.module._get_config_field.assert_any_call("currentbrightness")
-        mock_lib.print_str.assert_called_with("0706")
-        mock_lib.set_decimal.assert_any_call(1, True)
+        mock_lib.set_digit_raw.assert_any_call(0, DIGIT_VALUES["0"])
+        mock_lib.set_digit_raw.assert_any_call(1, DIGIT_VALUES["7"] | DECIMAL_MASK)
+        mock_lib.set_digit_raw.assert_any_call(2, DIGIT_VALUES["0"])
+        mock_lib.set_digit_raw.assert_any_call(3, DIGIT_VALUES["6"])
 
     def test_on_stop(self):
         self.init_session(mock_on_stop=False)
@@ -87,111 +143,299 @@ class TestsFourletterdisplay(unittest.TestCase):
         except:
             self.fail("Should not raise exception during _configure call")
 
-    def test_on_event_sunrise_nightmode_enabled(self):
-        self.init_session()
-        nightmode = True
-        brightness = 10
-        self.module._get_config_field = Mock(side_effect=[nightmode, brightness])
-        self.module.change_brightness = Mock()
+    def start_with_snapshot(self, snapshot):
+        save_snapshot(make_cleep_filesystem(), SNAPSHOT_FILE, pack_snapshot(snapshot))
+        self.init_session(mock_on_start=False)
+        self.mock_config()
+        mock_lib.reset_mock()
+        self.module._on_start()
 
-        self.module.on_event(
-            {
-                "event": "test.time.sunrise",
-            }
+    def test_on_start_restore_snapshot(self):
+        digits = tuple(DIGIT_VALUES[char] for char in "helo")
+        self.start_with_snapshot(
+            FrameSnapshot(
+                KIND_MESSAGE, time.time(), None, digits, [False, False, False, True], 1000
+            )
         )
 
-        mock_lib.set_brightness.assert_called_with(brightness)
+        mock_lib.set_digit_raw.assert_has_calls(
+            [
+                call(0, digits[0]),
+                call(1, digits[1]),
+                call(2, digits[2]),
+                call(3, digits[3] | DECIMAL_MASK),
+            ]
+        )
+        mock_lib.show.assert_called_once()
+        mock_lib.set_blink.assert_called_once_with(mock_lib.HT16K33_BLINK_1HZ)
 
-    def test_on_event_sunrise_nightmode_disabled(self):
-        self.init_session()
-        nightmode = False
-        brightness = 10
-        self.module._get_config_field = Mock(side_effect=[nightmode, brightness])
-        self.module.change_brightness = Mock()
+    @patch("backend.fourletterdisplay.datetime")
+    def test_on_start_restore_snapshot_expired_content(self, mock_datetime):
+        mock_datetime.now.return_value = datetime(2022, 12, 18, 7, 6, 22, 0)
+        self.start_with_snapshot(
+            FrameSnapshot(
+                KIND_VALUE,
+                time.time() - 1000,
+                time.time() - 100,
+                (1, 2, 3, 4),
+                [False, False, False, True],
+                0,
+            )
+        )
 
-        self.module.on_event(
-            {
-                "event": "test.time.sunrise",
-            }
+        mock_lib.set_digit_raw.assert_has_calls(
+            [
+                call(0, DIGIT_VALUES["0"]),
+                call(1, DIGIT_VALUES["7"] | DECIMAL_MASK),
+                call(2, DIGIT_VALUES["0"]),
+                call(3, DIGIT_VALUES["6"] | DECIMAL_MASK),
+            ]
+        )
+        mock_lib.show.assert_called_once()
+
+    def mock_snapshot_store(self):
+        scheduler = Mock()
+        self.module.snapshot_store = SnapshotStore(
+            scheduler,
+            make_cleep_filesystem(),
+            SNAPSHOT_FILE,
+            self.module._Fourletterdisplay__get_snapshot,
         )
+        self.module.snapshot_store.load()
+        self.module.snapshot_store.start()
+        return scheduler
 
-        self.assertFalse(self.module.change_brightness.called)
+    def test_snapshot_saved(self):
+        self.start_with_snapshot(
+            FrameSnapshot(KIND_NONE, time.time(), None, (0, 0, 0, 0), [False] * 4, 0)
+        )
+        scheduler = self.mock_snapshot_store()
 
-    def test_on_event_sunset_nightmode_enabled(self):
-        self.init_session()
-        nightmode = True
-        nightbrightness = 0
-        self.module._get_config_field = Mock(side_effect=[nightmode, nightbrightness])
+        self.module.display_message("helo")
+        self.module.set_dots(most_left=True)
+
+        scheduler.schedule.assert_called_once_with(SnapshotStore.SAVE_DELAY, unittest.mock.ANY)
+        scheduler.schedule.call_args[0][1]()
+        snapshot = load_snapshot(SNAPSHOT_FILE, time.time())
+        self.assertEqual(snapshot.kind, KIND_MESSAGE)
+        self.assertEqual(snapshot.digits, tuple(DIGIT_VALUES[char] for char in "helo"))
+        self.assertTrue(snapshot.dots[0])
+
+    def test_snapshot_value_saved_later(self):
+        self.start_with_snapshot(
+            FrameSnapshot(KIND_NONE, time.time(), None, (0, 0, 0, 0), [False] * 4, 0)
+        )
+        scheduler = self.mock_snapshot_store()
 
-        self.module.on_event(
-            {
-                "event": "test.time.sunset",
-            }
+        self.module.display_gauge(50)
+        self.module.display_number(12.5)
+
+        scheduler.schedule.assert_called_once_with(
+            SnapshotStore.VALUE_SAVE_DELAY, unittest.mock.ANY
+        )
+
+        # dots change is saved sooner
+        self.module.set_dots(most_left=True)
+
+        scheduler.cancel.assert_called_with(scheduler.schedule.return_value)
+        scheduler.schedule.assert_called_with(SnapshotStore.SAVE_DELAY, unittest.mock.ANY)
+        self.assertEqual(scheduler.schedule.call_count, 2)
+
+    @patch("backend.framesnapshot.save_snapshot")
+    def test_snapshot_not_saved_when_time_changes(self, mock_save_snapshot):
+        self.start_with_snapshot(
+            FrameSnapshot(
+                KIND_NONE, time.time(), None, (0, 0, 0, 0), [False, True, False, False], 0
+            )
+        )
+        scheduler = self.mock_snapshot_store()
+
+        self.module.on_render("MessageProfile", {"message": "1234"})
+        scheduler.schedule.call_args[0][1]()
+
+        self.assertFalse(mock_save_snapshot.called)
+
+    def test_on_stop_save_snapshot(self):
+        self.start_with_snapshot(
+            FrameSnapshot(KIND_NONE, time.time(), None, (0, 0, 0, 0), [False] * 4, 0)
         )
+        self.module.display_message("helo")
+
+        self.module._on_stop()
+
+        snapshot = load_snapshot(SNAPSHOT_FILE, time.time())
+        self.assertEqual(snapshot.kind, KIND_MESSAGE)
+        self.module.snapshot_store.cleep_filesystem.rename.assert_called_with(
+            f"{SNAPSHOT_FILE}.tmp", SNAPSHOT_FILE
+        )
+
+    def mock_config(self, **config):
+        values = dict(Fourletterdisplay.DEFAULT_CONFIG)
+        values.update(config)
+        self.module._get_config_field = Mock(side_effect=lambda field: values[field])
+        self.module._set_config_field = Mock(side_effect=values.__setitem__)
+
+    def time_now_event(self, sunrise_delay, sunset_delay):
+        now = time.time()
+        return {
+            "event": "parameters.time.now",
+            "params": {
+                "hour": 12,
+                "minute": 0,
+                "sunrise": now + sunrise_delay,
+                "sunset": now + sunset_delay,
+            },
+        }
+
+    def test_on_start_restore_brightness_not_saved(self):
+        self.init_session(mock_on_start=False)
+        self.mock_config(currentbrightness=10)
+
+        self.module._on_start()
+
+        mock_lib.set_brightness.assert_called_with(10)
+        for field_call in self.module._set_config_field.call_args_list:
+            self.assertNotEqual(field_call[0][0], "currentbrightness")
+
+    def set_night(self, is_night):
+        now = time.time()
+        if is_night:
+            self.module.brightness.set_sun_schedule(now + 3600, now + 7200)
+        else:
+            self.module.brightness.set_sun_schedule(now - 3600, now + 3600)
+
+    @patch("backend.fourletterdisplay.datetime")
+    def test_on_start_sun_schedule(self, mock_datetime):
+        mock_datetime.now.return_value = datetime(2022, 12, 18, 23, 6, 22, 0)
+        self.init_session(mock_on_start=False)
+        now = time.time()
+        get_sun_command = self.session.make_mock_command(
+            "get_sun", {"sunrise": now - 7200, "sunset": now - 3600}, False, False
+        )
+        self.session.add_mock_command(get_sun_command)
+        self.mock_config(nightmode=True, nightbrightness=3, currentbrightness=10)
+
+        self.module._on_start()
+
+        self.assertTrue(self.module.is_night_mode)
+        mock_lib.set_brightness.assert_called_with(3)
+
+    def test_on_event_time_now_night_nightmode_enabled(self):
+        self.init_session()
+        self.mock_config(nightmode=True, brightness=10, nightbrightness=3)
+
+        self.module.on_event(self.time_now_event(3600, 7200))
+
+        self.assertTrue(self.module.is_night_mode)
+        mock_lib.set_brightness.assert_called_once_with(3)
+        self.module._set_config_field.assert_called_with("currentbrightness", 3)
+
+    def test_on_event_time_now_night_nightmode_disabled(self):
+        self.init_session()
+        self.mock_config(nightmode=False, brightness=10, nightbrightness=3)
+
+        self.module.on_event(self.time_now_event(3600, 7200))
+
+        self.assertTrue(self.module.is_night_mode)
+        mock_lib.set_brightness.assert_called_once_with(10)
+
+    def test_on_event_time_now_day(self):
+        self.init_session()
+        self.mock_config(nightmode=True, brightness=10, nightbrightness=3)
+
+        self.module.on_event(self.time_now_event(-3600, 3600))
+
+        self.assertFalse(self.module.is_night_mode)
+        mock_lib.set_brightness.assert_called_once_with(10)
+
+    def test_on_event_time_now_same_schedule(self):
+        self.init_session()
+        self.mock_config(nightmode=True, brightness=10, nightbrightness=3)
+        event = self.time_now_event(3600, 7200)
+        self.module.on_event(event)
+        mock_lib.reset_mock()
 
-        mock_lib.set_brightness.assert_called_with(nightbrightness)
+        self.module.on_event(event)
 
-    def test_on_event_sunset_nightmode_disabled(self):
+        self.assertFalse(mock_lib.set_brightness.called)
+
+    def test_on_event_time_now_without_sun_schedule(self):
         self.init_session()
-        nightmode = False
-        nightbrightness = 10
-        self.module._get_config_field = Mock(side_effect=[nightmode, nightbrightness])
-        self.module.change_brightness = Mock()
+        self.module.brightness = Mock()
 
+        self.module.on_event({"event": "parameters.time.now", "params": {"sunrise": 1000.0}})
         self.module.on_event(
-            {
-                "event": "test.time.sunset",
-            }
+            {"event": "parameters.time.now", "params": {"sunrise": None, "sunset": None}}
         )
 
-        self.assertFalse(self.module.change_brightness.called)
+        self.assertFalse(self.module.brightness.set_sun_schedule.called)
+
+    def test_on_event_sunset(self):
+        self.init_session()
+        self.mock_config(nightmode=True, brightness=10, nightbrightness=3)
+        self.module.on_event(self.time_now_event(-3600, 0.1))
+        mock_lib.reset_mock()
+
+        time.sleep(0.3)
+
+        self.assertTrue(self.module.is_night_mode)
+        mock_lib.set_brightness.assert_called_once_with(3)
+
+    def test_on_event_without_sun_schedule(self):
+        self.init_session()
+        self.mock_config(nightmode=True)
+
+        self.module.on_event({"event": "test.time.sunset", "params": {}})
+
+        self.assertFalse(self.module.is_night_mode)
+        self.assertFalse(mock_lib.set_brightness.called)
 
     def test_on_render_message_profile(self):
         self.init_session()
-        self.module.display_message = Mock()
-        self.module.set_dots = Mock()
         message = "Hello"
 
         self.module.on_render("MessageProfile", {"message": message})
 
-        self.module.display_message.assert_called_with(message)
-        self.module.set_dots.assert_called_with(middle_left=True)
+        mock_lib.set_digit_raw.assert_has_calls(
+            [
+                call(0, DIGIT_VALUES["H"]),
+                call(1, DIGIT_VALUES["e"] | DECIMAL_MASK),
+                call(2, DIGIT_VALUES["l"]),
+                call(3, DIGIT_VALUES["l"]),
+            ]
+        )
+        mock_lib.show.assert_called_once()
 
     def test_on_render_alarm_profile_scheduled(self):
         self.init_session()
-        self.module.display_message = Mock()
-        self.module.set_dots = Mock()
-        message = "Hello"
 
         self.module.on_render(
             "AlarmProfile", {"status": AlarmProfile.STATUS_SCHEDULED, "count": 1}
         )
 
-        self.module.set_dots.assert_called_with(most_right=True)
+        mock_lib.set_digit_raw.assert_any_call(3, DECIMAL_MASK)
 
     def test_on_render_alarm_profile_unscheduled_without_other_alarm_sheduled(self):
         self.init_session()
-        self.module.display_message = Mock()
-        self.module.set_dots = Mock()
-        message = "Hello"
+        self.module.on_render(
+            "AlarmProfile", {"status": AlarmProfile.STATUS_SCHEDULED, "count": 1}
+        )
+        mock_lib.reset_mock()
 
         self.module.on_render(
             "AlarmProfile", {"status": AlarmProfile.STATUS_UNSCHEDULED, "count": 0}
         )
 
-        self.module.set_dots.assert_called_with(most_right=False)
+        mock_lib.set_digit_raw.assert_called_once_with(3, 0)
 
     def test_on_render_alarm_profile_unscheduled_with_other_alarm_scheduled(self):
         self.init_session()
-        self.module.display_message = Mock()
-        self.module.set_dots = Mock()
-        message = "Hello"
 
         self.module.on_render(
             "AlarmProfile", {"status": AlarmProfile.STATUS_UNSCHEDULED, "count": 1}
         )
 
-        self.module.set_dots.assert_called_with(most_right=True)
+        mock_lib.set_digit_raw.assert_any_call(3, DECIMAL_MASK)
 
     def test_on_render_unsupported_profile(self):
         self.init_session()
@@ -203,6 +447,277 @@ class TestsFourletterdisplay(unittest.TestCase):
 
         self.assertFalse(self.module.display_message.called)
         self.assertFalse(self.module.set_dots.called)
+        self.assertFalse(mock_lib.show.called)
+
+    def test_on_render_gauge_profile(self):
+        self.init_session()
+
+        self.module.on_render("GaugeProfile", {"value": 50, "minimum": 0, "maximum": 100})
+
+        mock_lib.set_digit_raw.assert_has_calls(
+            [call(pos, digit) for pos, digit in enumerate(GAUGE_FRAMES[12])]
+        )
+        mock_lib.show.assert_called_once()
+
+    def test_on_render_gauge_profile_only_changed_digits(self):
+        self.init_session()
+        self.module.on_render("GaugeProfile", {"value": 50, "minimum": 0, "maximum": 100})
+        mock_lib.reset_mock()
+
+        self.module.on_render("GaugeProfile", {"value": 55, "minimum": 0, "maximum": 100})
+
+        mock_lib.set_digit_raw.assert_called_once_with(2, GAUGE_FRAMES[13][2])
+        mock_lib.show.assert_called_once()
+
+    def test_display_gauge(self):
+        self.init_session()
+
+        self.module.display_gauge(25, 20, 30)
+
+        mock_lib.set_digit_raw.assert_has_calls(
+            [call(pos, digit) for pos, digit in enumerate(GAUGE_FRAMES[12])]
+        )
+
+    def test_display_gauge_invalid_params(self):
+        self.init_session()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.display_gauge(None)
+        self.assertEqual(str(cm.exception), 'Parameter "value" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.display_gauge("helo")
+        self.assertEqual(str(cm.exception), 'Parameter "value" must be of type "float"')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.display_gauge(10, 20, 10)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "maximum" must be greater than "minimum"'
+        )
+
+    def test_on_render_number_profile(self):
+        self.init_session()
+
+        self.module.on_render("NumberProfile", {"value": 21.5, "decimals": 1, "unit": "C"})
+
+        mock_lib.set_digit_raw.assert_has_calls(
+            [
+                call(0, DIGIT_VALUES["2"]),
+                call(1, DIGIT_VALUES["1"] | DECIMAL_MASK),
+                call(2, DIGIT_VALUES["5"]),
+                call(3, DIGIT_VALUES["C"]),
+            ]
+        )
+        mock_lib.show.assert_called_once()
+
+    def test_display_number(self):
+        self.init_session()
+
+        self.module.display_number(45, unit="%")
+
+        mock_lib.set_digit_raw.assert_has_calls(
+            [
+                call(0, DIGIT_VALUES[" "]),
+                call(1, DIGIT_VALUES["4"]),
+                call(2, DIGIT_VALUES["5"]),
+                call(3, DIGIT_VALUES["%"]),
+            ]
+        )
+
+    def test_display_number_invalid_params(self):
+        self.init_session()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.display_number(None)
+        self.assertEqual(str(cm.exception), 'Parameter "value" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.display_number("12")
+        self.assertEqual(str(cm.exception), 'Parameter "value" must be of type "float"')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.display_number(12, decimals=4)
+        self.assertEqual(str(cm.exception), 'Parameter "decimals" must be between 0..3')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.display_number(12, unit="deg")
+        self.assertEqual(str(cm.exception), 'Parameter "unit" must be 2 chars max')
+
+    def test_display_gauge_postponed_when_busy(self):
+        self.init_session()
+        self.module.scheduler = Mock()
+        self.module.redraw_throttle = RedrawThrottle(self.module.scheduler, self.module.load_monitor)
+        self.module.load_monitor.notify_activity = Mock()
+        self.module.load_monitor.level = LoadMonitor.LEVEL_MINIMAL
+        self.module.display_gauge(50)
+        mock_lib.reset_mock()
+
+        self.module.display_gauge(60)
+        self.module.display_gauge(70)
+
+        self.assertFalse(mock_lib.set_digit_raw.called)
+        self.module.scheduler.schedule.assert_called_once()
+        self.assertEqual(self.module.load_monitor.postponed, 2)
+
+        # only last postponed frame is displayed
+        self.module.scheduler.schedule.call_args[0][1]()
+        mock_lib.set_digit_raw.assert_has_calls(
+            [
+                call(pos, digit)
+                for pos, digit in enumerate(GAUGE_FRAMES[17])
+                if digit != GAUGE_FRAMES[12][pos]
+            ]
+        )
+
+    def test_load_checked_only_while_active(self):
+        self.init_session(mock_on_start=False)
+        self.module.load_monitor.notify_activity = Mock()
+
+        self.module._on_start()
+        self.module.display_message("helo")
+        self.assertFalse(self.module.load_monitor.notify_activity.called)
+
+        self.module.display_gauge(50)
+        self.module.load_monitor.notify_activity.assert_called_once()
+
+    def test_postponed_redraw_dropped_by_time(self):
+        self.init_session()
+        self.module.scheduler = Mock()
+        self.module.redraw_throttle = RedrawThrottle(self.module.scheduler, self.module.load_monitor)
+        self.module.load_monitor.notify_activity = Mock()
+        self.module.load_monitor.level = LoadMonitor.LEVEL_MINIMAL
+        self.module.display_gauge(50)
+        self.module.display_gauge(60)
+
+        self.module.on_render("MessageProfile", {"message": "1200"})
+
+        self.module.scheduler.cancel.assert_called_with(
+            self.module.scheduler.schedule.return_value
+        )
+
+    def test_set_load_thresholds(self):
+        self.init_session()
+        self.module._set_config_field = Mock()
+
+        self.module.set_load_thresholds(200, 2)
+
+        self.module._set_config_field.assert_has_calls(
+            [call("lagthreshold", 200), call("loadthreshold", 2.0)]
+        )
+
+    def test_set_load_thresholds_invalid_params(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_load_thresholds(0, 1.5)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "lag_threshold" must be greater than 0'
+        )
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_load_thresholds(100, "1")
+        self.assertEqual(
+            str(cm.exception), 'Parameter "load_threshold" must be of type "float"'
+        )
+
+    def test_start_recording(self):
+        self.init_session()
+        self.module.recorder = Mock()
+
+        self.module.start_recording()
+
+        self.module.recorder.start.assert_called_with("/tmp/fourletterdisplay.trace.gz")
+
+    def test_stop_recording(self):
+        self.init_session()
+        self.module.recorder = Mock()
+        self.module.recorder.stop.return_value = {"path": "/tmp/trace", "records": 3}
+
+        infos = self.module.stop_recording()
+
+        self.assertEqual(infos, {"path": "/tmp/trace", "records": 3})
+
+    def test_recorded_traffic(self):
+        self.init_session()
+        self.module.recorder = Mock()
+
+        self.module.on_render("MessageProfile", {"message": "1234"})
+        self.module.on_event({"event": "parameters.time.sunset", "params": {}})
+        self.module.display_message("helo")
+
+        self.module.recorder.record_render.assert_called_with("MessageProfile", {"message": "1234"})
+        self.module.recorder.record_event.assert_called_with(
+            {"event": "parameters.time.sunset", "params": {}}
+        )
+        self.module.recorder.record_command.assert_called_once_with(
+            "display_message", message="helo"
+        )
+
+    @patch("backend.fourletterdisplay.DisplayProcess")
+    def test_on_start_isolated_io(self, mock_displayprocess):
+        self.init_session(mock_on_start=False)
+        config = dict(Fourletterdisplay.DEFAULT_CONFIG, isolatedio=True)
+        self.module._get_config_field = Mock(side_effect=lambda field: config[field])
+
+        self.module._on_start()
+
+        mock_displayprocess.return_value.start.assert_called()
+        mock_displayprocess.return_value.show.assert_called()
+        self.assertFalse(mock_lib.show.called)
+
+    @patch("backend.fourletterdisplay.DisplayProcess")
+    def test_on_stop_isolated_io(self, mock_displayprocess):
+        self.init_session(mock_on_start=False, mock_on_stop=False)
+        self.module._set_config_field = Mock()
+        self.module.enable_isolated_io(True)
+        calls = []
+        mock_displayprocess.return_value.show.side_effect = lambda: calls.append("show")
+        mock_displayprocess.return_value.stop.side_effect = lambda: calls.append("process")
+        self.module.scheduler.stop = Mock(side_effect=lambda: calls.append("scheduler"))
+
+        self.module._on_stop()
+
+        self.assertEqual(calls, ["show", "process", "scheduler"])
+
+    @patch("backend.fourletterdisplay.DisplayProcess")
+    def test_enable_isolated_io(self, mock_displayprocess):
+        self.init_session()
+        self.module._set_config_field = Mock()
+        self.module.display_message("1234")
+
+        self.module.enable_isolated_io(True)
+
+        self.module._set_config_field.assert_any_call("isolatedio", True)
+        mock_displayprocess.return_value.start.assert_called()
+        mock_displayprocess.return_value.set_brightness.assert_called()
+        mock_displayprocess.return_value.set_digit_raw.assert_any_call(
+            3, DIGIT_VALUES["4"]
+        )
+        mock_displayprocess.return_value.show.assert_called()
+
+    @patch("backend.fourletterdisplay.DisplayProcess")
+    def test_disable_isolated_io(self, mock_displayprocess):
+        self.init_session()
+        self.module._set_config_field = Mock()
+        self.module.enable_isolated_io(True)
+        mock_lib.reset_mock()
+
+        self.module.enable_isolated_io(False)
+
+        self.module._set_config_field.assert_any_call("isolatedio", False)
+        mock_displayprocess.return_value.stop.assert_called()
+        mock_lib.show.assert_called()
+
+    def test_enable_isolated_io_invalid_params(self):
+        self.init_session()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.enable_isolated_io(None)
+        self.assertEqual(str(cm.exception), 'Parameter "enable" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.enable_isolated_io("test")
+        self.assertEqual(str(cm.exception), 'Parameter "enable" must be of type "bool"')
 
     def test_import_lib(self):
         self.init_session(False, mock_on_start=False)
@@ -242,60 +757,59 @@ class TestsFourletterdisplay(unittest.TestCase):
 
     def test_enable_night_mode_enabled_during_day(self):
         self.init_session()
-        self.module._set_config_field = Mock()
-        self.module._get_config_field = Mock(return_value=6)
-        self.module.set_brightness = Mock()
-        self.module.is_night_mode = False
+        self.mock_config(brightness=6, nightbrightness=2)
+        self.set_night(False)
 
         self.module.enable_night_mode(True)
 
         self.module._set_config_field.assert_any_call("nightmode", True)
         self.module._set_config_field.assert_any_call("currentbrightness", 6)
-        self.module._get_config_field.assert_called_with("brightness")
         mock_lib.set_brightness.assert_called_with(6)
 
     def test_enable_night_mode_enabled_during_night(self):
         self.init_session()
-        self.module._set_config_field = Mock()
-        self.module._get_config_field = Mock(return_value=6)
-        self.module.set_brightness = Mock()
-        self.module.is_night_mode = True
+        self.mock_config(brightness=6, nightbrightness=2)
+        self.set_night(True)
 
         self.module.enable_night_mode(True)
 
         self.module._set_config_field.assert_any_call("nightmode", True)
-        self.module._set_config_field.assert_any_call("currentbrightness", 6)
-        self.module._get_config_field.assert_any_call("nightbrightness")
-        mock_lib.set_brightness.assert_called_with(6)
+        self.module._set_config_field.assert_any_call("currentbrightness", 2)
+        mock_lib.set_brightness.assert_called_with(2)
 
     def test_enable_night_mode_disabled_during_day(self):
         self.init_session()
-        self.module._set_config_field = Mock()
-        self.module._get_config_field = Mock(return_value=6)
-        self.module.set_brightness = Mock()
-        self.module.is_night_mode = False
+        self.mock_config(nightmode=True, brightness=6, nightbrightness=2)
+        self.set_night(False)
 
         self.module.enable_night_mode(False)
 
         self.module._set_config_field.assert_any_call("nightmode", False)
         self.module._set_config_field.assert_any_call("currentbrightness", 6)
-        self.module._get_config_field.assert_called_with("brightness")
         mock_lib.set_brightness.assert_called_with(6)
 
     def test_enable_night_mode_disabled_during_night(self):
         self.init_session()
-        self.module._set_config_field = Mock()
-        self.module._get_config_field = Mock(return_value=6)
-        self.module.set_brightness = Mock()
-        self.module.is_night_mode = True
+        self.mock_config(nightmode=True, brightness=6, nightbrightness=2)
+        self.set_night(True)
 
         self.module.enable_night_mode(False)
 
         self.module._set_config_field.assert_any_call("nightmode", False)
         self.module._set_config_field.assert_any_call("currentbrightness", 6)
-        self.module._get_config_field.assert_called_with("brightness")
         mock_lib.set_brightness.assert_called_with(6)
 
+    def test_enable_night_mode_same_level(self):
+        self.init_session()
+        self.mock_config(brightness=6, nightbrightness=6)
+        self.set_night(True)
+        self.module.set_brightness(6)
+        mock_lib.reset_mock()
+
+        self.module.enable_night_mode(True)
+
+        self.assertFalse(mock_lib.set_brightness.called)
+
     def test_enable_night_mode_invalid_params(self):
         self.init_session()
 
@@ -309,8 +823,10 @@ class TestsFourletterdisplay(unittest.TestCase):
 
     def test_set_night_mode_brightness_during_day(self):
         self.init_session()
-        self.module.is_night_mode = False
-        self.module._set_config_field = Mock()
+        self.mock_config(nightmode=True)
+        self.set_night(False)
+        self.module.set_brightness(10)
+        mock_lib.reset_mock()
 
         self.module.set_night_mode_brightness(12)
 
@@ -319,8 +835,8 @@ class TestsFourletterdisplay(unittest.TestCase):
 
     def test_set_night_mode_brightness_during_night(self):
         self.init_session()
-        self.module.is_night_mode = True
-        self.module._set_config_field = Mock()
+        self.mock_config(nightmode=True)
+        self.set_night(True)
 
         self.module.set_night_mode_brightness(2)
 
@@ -360,42 +876,128 @@ class TestsFourletterdisplay(unittest.TestCase):
 
         self.module.display_message("helo")
 
-        mock_lib.print_str.assert_called_with("helo")
+        mock_lib.set_digit_raw.assert_has_calls(
+            [
+                call(0, DIGIT_VALUES["h"]),
+                call(1, DIGIT_VALUES["e"]),
+                call(2, DIGIT_VALUES["l"]),
+                call(3, DIGIT_VALUES["o"]),
+            ]
+        )
+        mock_lib.show.assert_called()
 
-    def test_set_brightness_during_day(self):
+    def test_display_message_only_changed_digits(self):
         self.init_session()
-        self.module.is_night_mode = False
-        self.module._set_config_field = Mock()
+        self.module.display_message("1234")
+        mock_lib.reset_mock()
 
-        self.module.set_brightness(12)
+        self.module.display_message("1235")
 
-        self.module._set_config_field.assert_any_call("brightness", 12)
-        self.module._set_config_field.assert_any_call("currentbrightness", 12)
-        mock_lib.set_brightness.assert_called_with(12)
+        mock_lib.set_digit_raw.assert_called_once_with(3, DIGIT_VALUES["5"])
+        mock_lib.show.assert_called_once()
 
-    def test_set_brightness_during_night(self):
+    def test_display_message_same_message(self):
         self.init_session()
-        self.module.is_night_mode = True
-        self.module._set_config_field = Mock()
+        self.module.display_message("1234")
+        mock_lib.reset_mock()
 
-        self.module.set_brightness(2)
+        self.module.display_message("1234")
 
-        self.module._set_config_field.assert_called_with("brightness", 2)
-        self.assertFalse(mock_lib.set_brightness.called)
+        self.assertFalse(mock_lib.set_digit_raw.called)
+        self.assertFalse(mock_lib.show.called)
 
-    def test_set_brightness_invalid_params(self):
+    def test_get_state(self):
         self.init_session()
+        self.module.display_message("helo")
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.set_brightness(None)
-        self.assertEqual(str(cm.exception), 'Parameter "brightness" is missing')
+        state = self.module.get_state()
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.set_brightness("helo")
+        self.assertFalse(state["unchanged"])
+        self.assertEqual(state["text"], "helo")
         self.assertEqual(
-            str(cm.exception), 'Parameter "brightness" must be of type "int"'
+            state["frame"],
+            [DIGIT_VALUES["h"], DIGIT_VALUES["e"], DIGIT_VALUES["l"], DIGIT_VALUES["o"]],
         )
-
+        self.assertEqual(state["dots"], [False, False, False, False])
+        self.assertFalse(state["isnightmode"])
+        self.assertEqual(state["blink"], 0)
+        self.assertFalse(state["alarmringing"])
+        self.assertIsNone(state["timer"])
+        self.assertTrue("config" in state)
+
+    def test_get_state_unchanged(self):
+        self.init_session()
+        self.module.display_message("helo")
+        version = self.module.get_state()["version"]
+
+        self.module.display_message("helo")
+        state = self.module.get_state(version)
+
+        self.assertEqual(state, {"version": version, "unchanged": True})
+
+    def test_get_state_version_changes(self):
+        self.init_session()
+        version = self.module.get_state()["version"]
+
+        self.module.display_message("helo")
+        state = self.module.get_state(version)
+        self.assertFalse(state["unchanged"])
+        self.assertGreater(state["version"], version)
+
+        self.module.set_blink(500)
+        self.assertGreater(self.module.get_state()["version"], state["version"])
+
+    def test_get_state_version_not_reset_on_restart(self):
+        started_at = time.time_ns() // 1000000
+
+        self.init_session()
+
+        # version known before restart can not match new state
+        self.assertGreaterEqual(self.module.get_state()["version"], started_at)
+
+    def test_get_state_invalid_params(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.get_state("1")
+        self.assertEqual(str(cm.exception), 'Parameter "version" must be of type "int"')
+
+    def test_set_brightness_during_day(self):
+        self.init_session()
+        self.mock_config(nightmode=True)
+        self.set_night(False)
+
+        self.module.set_brightness(12)
+
+        self.module._set_config_field.assert_any_call("brightness", 12)
+        self.module._set_config_field.assert_any_call("currentbrightness", 12)
+        mock_lib.set_brightness.assert_called_with(12)
+
+    def test_set_brightness_during_night(self):
+        self.init_session()
+        self.mock_config(nightmode=True, nightbrightness=4)
+        self.set_night(True)
+        self.module.set_night_mode_brightness(4)
+        mock_lib.reset_mock()
+
+        self.module.set_brightness(2)
+
+        self.module._set_config_field.assert_called_with("brightness", 2)
+        self.assertFalse(mock_lib.set_brightness.called)
+
+    def test_set_brightness_invalid_params(self):
+        self.init_session()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_brightness(None)
+        self.assertEqual(str(cm.exception), 'Parameter "brightness" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_brightness("helo")
+        self.assertEqual(
+            str(cm.exception), 'Parameter "brightness" must be of type "int"'
+        )
+
         with self.assertRaises(InvalidParameter) as cm:
             self.module.set_brightness(20)
         self.assertEqual(
@@ -407,11 +1009,158 @@ class TestsFourletterdisplay(unittest.TestCase):
 
         self.module.set_dots(True, False, True, False)
 
-        mock_lib.set_decimal.assert_has_calls(
-            [call(0, True), call(1, False), call(2, True), call(3, False)]
+        mock_lib.set_digit_raw.assert_has_calls(
+            [call(0, DECIMAL_MASK), call(1, 0), call(2, DECIMAL_MASK), call(3, 0)]
         )
         mock_lib.show.assert_called()
 
+    def test_set_dots_keep_message(self):
+        self.init_session()
+        self.module.display_message("1234")
+        mock_lib.reset_mock()
+
+        self.module.set_dots(middle_left=True)
+
+        mock_lib.set_digit_raw.assert_called_once_with(1, DIGIT_VALUES["2"] | DECIMAL_MASK)
+
+    def test_start_countdown(self):
+        self.init_session()
+        self.module.scheduler = Mock()
+
+        self.module.start_countdown(90)
+
+        mock_lib.set_digit_raw.assert_has_calls(
+            [
+                call(0, DIGIT_VALUES["0"]),
+                call(1, DIGIT_VALUES["1"] | DECIMAL_MASK),
+                call(2, DIGIT_VALUES["3"]),
+                call(3, DIGIT_VALUES["0"]),
+            ]
+        )
+        self.assertAlmostEqual(self.module.scheduler.schedule.call_args[0][0], 1.0, delta=0.1)
+
+    def test_countdown_ended(self):
+        self.init_session()
+        self.module.scheduler = Mock()
+        self.module.start_countdown(1)
+        timer = self.module._Fourletterdisplay__timer
+        timer.started_at -= 2
+        self.module.scheduler.reset_mock()
+
+        self.module._Fourletterdisplay__update_timer(timer)
+
+        mock_lib.set_digit_raw.assert_any_call(3, DIGIT_VALUES["0"])
+        self.assertFalse(self.module.scheduler.schedule.called)
+        self.assertIsNone(self.module._Fourletterdisplay__timer)
+        self.session.assert_event_called_with(
+            "fourletterdisplay.countdown.ended", {"duration": 1}
+        )
+
+    def test_start_countdown_invalid_params(self):
+        self.init_session()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.start_countdown(None)
+        self.assertEqual(str(cm.exception), 'Parameter "duration" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.start_countdown("helo")
+        self.assertEqual(str(cm.exception), 'Parameter "duration" must be of type "int"')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.start_countdown(0)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "duration" must be between 1..359940'
+        )
+
+    def test_start_stopwatch(self):
+        self.init_session()
+        self.module.scheduler = Mock()
+
+        self.module.start_stopwatch()
+
+        mock_lib.set_digit_raw.assert_any_call(1, DIGIT_VALUES["0"] | DECIMAL_MASK)
+        self.module.scheduler.schedule.assert_called()
+
+    def test_stop_timer(self):
+        self.init_session()
+        self.module.scheduler = Mock()
+        self.module.start_stopwatch()
+
+        self.module.stop_timer()
+
+        self.module.scheduler.cancel.assert_called_with(
+            self.module.scheduler.schedule.return_value
+        )
+        self.assertIsNone(self.module._Fourletterdisplay__timer)
+
+    def test_on_render_message_profile_timer_running(self):
+        self.init_session()
+        self.module.scheduler = Mock()
+        self.module.start_stopwatch()
+        mock_lib.reset_mock()
+
+        self.module.on_render("MessageProfile", {"message": "1234"})
+
+        self.assertFalse(mock_lib.set_digit_raw.called)
+
+    def test_set_blink(self):
+        self.init_session()
+
+        self.module.set_blink(1000)
+
+        mock_lib.set_blink.assert_called_with(mock_lib.HT16K33_BLINK_1HZ)
+
+    def test_set_blink_same_period(self):
+        self.init_session()
+        self.module.set_blink(2000)
+        mock_lib.set_blink.reset_mock()
+
+        self.module.set_blink(2000)
+
+        self.assertFalse(mock_lib.set_blink.called)
+
+    def test_set_blink_invalid_params(self):
+        self.init_session()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_blink(None)
+        self.assertEqual(str(cm.exception), 'Parameter "period" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_blink("helo")
+        self.assertEqual(str(cm.exception), 'Parameter "period" must be of type "int"')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_blink(300)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "period" must be 0, 500, 1000 or 2000'
+        )
+
+    def test_on_render_alarm_profile_triggered(self):
+        self.init_session()
+
+        self.module.on_render("AlarmProfile", {"status": AlarmProfile.STATUS_TRIGGERED, "count": 1})
+
+        mock_lib.set_blink.assert_called_with(mock_lib.HT16K33_BLINK_2HZ)
+
+    def test_on_render_alarm_profile_stopped_restore_blink(self):
+        self.init_session()
+        self.module.set_blink(2000)
+        self.module.on_render("AlarmProfile", {"status": AlarmProfile.STATUS_TRIGGERED, "count": 1})
+
+        self.module.on_render("AlarmProfile", {"status": AlarmProfile.STATUS_STOPPED, "count": 1})
+
+        mock_lib.set_blink.assert_called_with(mock_lib.HT16K33_BLINK_HALFHZ)
+
+    def test_on_render_alarm_profile_snoozed_stop_blink(self):
+        self.init_session()
+        self.module.on_render("AlarmProfile", {"status": AlarmProfile.STATUS_TRIGGERED, "count": 1})
+
+        self.module.on_render("AlarmProfile", {"status": AlarmProfile.STATUS_SNOOZED, "count": 1})
+
+        mock_lib.set_blink.assert_called_with(mock_lib.HT16K33_BLINK_OFF)
+
 
 class TestsFourLetterPHatDriver(unittest.TestCase):
     def setUp(self):
@@ -480,6 +1229,963 @@ class TestsFourLetterPHatDriver(unittest.TestCase):
         self.assertFalse(self.driver.is_installed())
 
 
+class TestsFrameBuffer(unittest.TestCase):
+    def setUp(self):
+        self.lib = Mock()
+        self.framebuffer = FrameBuffer()
+
+    def test_flush_unknown_glass(self):
+        self.framebuffer.set_text("12")
+
+        written = self.framebuffer.flush(self.lib)
+
+        self.assertEqual(written, 4)
+        self.lib.set_digit_raw.assert_has_calls(
+            [call(0, 0), call(1, 0), call(2, DIGIT_VALUES["1"]), call(3, DIGIT_VALUES["2"])]
+        )
+        self.lib.show.assert_called_once()
+
+    def test_flush_unchanged_frame(self):
+        self.framebuffer.set_text("1234")
+        self.framebuffer.flush(self.lib)
+        self.lib.reset_mock()
+
+        written = self.framebuffer.flush(self.lib)
+
+        self.assertEqual(written, 0)
+        self.assertFalse(self.lib.set_digit_raw.called)
+        self.assertFalse(self.lib.show.called)
+
+    def test_flush_after_invalidate(self):
+        self.framebuffer.set_text("1234")
+        self.framebuffer.flush(self.lib)
+        self.lib.reset_mock()
+
+        self.framebuffer.invalidate()
+        written = self.framebuffer.flush(self.lib)
+
+        self.assertEqual(written, 4)
+
+    def test_set_dots(self):
+        self.framebuffer.set_dots(most_left=True, most_right=True)
+        self.framebuffer.set_dots(most_left=False, middle_left=True)
+
+        self.assertEqual(self.framebuffer.get_dots(), [False, True, False, True])
+
+    def test_get_frame(self):
+        self.framebuffer.set_text("12")
+        self.framebuffer.set_dots(middle_right=True)
+
+        self.assertEqual(
+            self.framebuffer.get_frame(),
+            (0, 0, DIGIT_VALUES["1"] | DECIMAL_MASK, DIGIT_VALUES["2"]),
+        )
+
+    def test_get_text(self):
+        self.assertEqual(self.framebuffer.get_text(), "")
+
+        self.framebuffer.set_text("helo")
+        self.assertEqual(self.framebuffer.get_text(), "helo")
+
+        self.framebuffer.set_digits((1, 2, 3, 4))
+        self.assertIsNone(self.framebuffer.get_text())
+
+    def test_clear(self):
+        self.framebuffer.set_text("1234")
+        self.framebuffer.set_dots(True, True, True, True)
+
+        self.framebuffer.clear()
+
+        self.assertEqual(self.framebuffer.get_frame(), (0, 0, 0, 0))
+
+
+class TestsDisplayTimer(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+
+    def clock(self):
+        return self.now
+
+    def test_countdown_display(self):
+        timer = DisplayTimer(DisplayTimer.MODE_COUNTDOWN, 90, clock=self.clock)
+
+        text, next_change = timer.get_display(1000.0)
+        self.assertEqual(text, "0130")
+        self.assertAlmostEqual(next_change, 1.0, delta=0.01)
+
+        text, next_change = timer.get_display(1000.4)
+        self.assertEqual(text, "0130")
+        self.assertAlmostEqual(next_change, 0.6, delta=0.01)
+
+        text, _ = timer.get_display(1001.0)
+        self.assertEqual(text, "0129")
+
+    def test_countdown_display_above_one_hour(self):
+        timer = DisplayTimer(DisplayTimer.MODE_COUNTDOWN, 3660, clock=self.clock)
+
+        text, next_change = timer.get_display(1000.0)
+        self.assertEqual(text, "0101")
+        self.assertAlmostEqual(next_change, 60.0, delta=0.01)
+
+        text, next_change = timer.get_display(1060.0)
+        self.assertEqual(text, "0100")
+        self.assertAlmostEqual(next_change, 1.0, delta=0.01)
+
+        text, _ = timer.get_display(1061.0)
+        self.assertEqual(text, "5959")
+
+    def test_countdown_ended(self):
+        timer = DisplayTimer(DisplayTimer.MODE_COUNTDOWN, 10, clock=self.clock)
+
+        self.assertFalse(timer.is_ended(1009.9))
+        self.assertTrue(timer.is_ended(1010.0))
+        self.assertEqual(timer.get_display(1020.0), ("0000", None))
+
+    def test_stopwatch_display(self):
+        timer = DisplayTimer(DisplayTimer.MODE_STOPWATCH, clock=self.clock)
+
+        text, next_change = timer.get_display(1000.0)
+        self.assertEqual(text, "0000")
+        self.assertAlmostEqual(next_change, 1.0, delta=0.01)
+
+        text, _ = timer.get_display(1075.5)
+        self.assertEqual(text, "0115")
+
+        text, next_change = timer.get_display(1000.0 + 3630)
+        self.assertEqual(text, "0100")
+        self.assertAlmostEqual(next_change, 30.0, delta=0.01)
+
+        self.assertFalse(timer.is_ended(1000.0 + 3630))
+
+    def test_stopwatch_display_max_duration(self):
+        timer = DisplayTimer(DisplayTimer.MODE_STOPWATCH, clock=self.clock)
+
+        self.assertEqual(timer.get_display(1000.0 + 100 * 3600), ("9959", None))
+
+
+class TestsNumberFormat(unittest.TestCase):
+    def test_encode_text_fold_dots(self):
+        self.assertEqual(
+            encode_text("21.5C"),
+            (
+                DIGIT_VALUES["2"],
+                DIGIT_VALUES["1"] | DECIMAL_MASK,
+                DIGIT_VALUES["5"],
+                DIGIT_VALUES["C"],
+            ),
+        )
+        self.assertEqual(
+            encode_text("1..2"),
+            (0, DIGIT_VALUES["1"] | DECIMAL_MASK, DECIMAL_MASK, DIGIT_VALUES["2"]),
+        )
+
+    def test_format_number(self):
+        self.assertEqual(format_number(21.5, 1, "C"), "21.5C")
+        self.assertEqual(format_number(21.54, 1, "C"), "21.5C")
+        self.assertEqual(format_number(45.4, 0, "%"), "45%")
+        self.assertEqual(format_number(3.14159, 3), "3.142")
+        self.assertEqual(format_number(-999, 0), "-999")
+
+    def test_format_number_reduce_decimals(self):
+        self.assertEqual(format_number(100, 1, "C"), "100C")
+        self.assertEqual(format_number(-12.3, 1, "C"), "-12C")
+
+    def test_format_number_negative_zero(self):
+        self.assertEqual(format_number(-0.04, 1, "C"), "0.0C")
+
+    def test_format_number_overflow(self):
+        self.assertEqual(format_number(1000, 0, "%"), "Hi%")
+        self.assertEqual(format_number(-1000, 0), "Lo")
+        self.assertEqual(format_number(float("inf"), 0), "Hi")
+        self.assertEqual(format_number(float("nan"), 1, "C"), "---C")
+
+    def test_encode_number(self):
+        self.assertEqual(encode_number(21.5, 1, "C"), encode_text("21.5C"))
+
+    def test_format_clock(self):
+        self.assertEqual(format_clock(7, 5), "0705")
+
+
+class TestsGauge(unittest.TestCase):
+    def test_gauge_frames(self):
+        self.assertEqual(len(GAUGE_FRAMES), GAUGE_LEVELS + 1)
+        self.assertEqual(GAUGE_FRAMES[0], (0, 0, 0, 0))
+        self.assertEqual(GAUGE_FRAMES[1], (0b0000000000010000, 0, 0, 0))
+        self.assertEqual(GAUGE_FRAMES[GAUGE_LEVELS], (0b0001001000110110,) * 4)
+
+    def test_gauge_frames_are_growing(self):
+        for level in range(1, GAUGE_LEVELS + 1):
+            for previous, current in zip(GAUGE_FRAMES[level - 1], GAUGE_FRAMES[level]):
+                self.assertEqual(previous & current, previous)
+
+    def test_get_gauge_level(self):
+        self.assertEqual(get_gauge_level(0, 0, 100), 0)
+        self.assertEqual(get_gauge_level(50, 0, 100), 12)
+        self.assertEqual(get_gauge_level(100, 0, 100), GAUGE_LEVELS)
+        self.assertEqual(get_gauge_level(-10, 0, 100), 0)
+        self.assertEqual(get_gauge_level(110, 0, 100), GAUGE_LEVELS)
+        self.assertEqual(get_gauge_level(0, -20, 20), 12)
+
+
+class TestsTrafficRecorder(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        self.recorder = TrafficRecorder(clock=lambda: self.now, wall_clock=lambda: 1600000000.0)
+        fd, self.path = tempfile.mkstemp(suffix=".gz")
+        os.close(fd)
+
+    def tearDown(self):
+        self.recorder.stop()
+        os.remove(self.path)
+
+    def test_record(self):
+        self.recorder.start(self.path)
+
+        self.recorder.record_render("MessageProfile", {"message": "1234"})
+        self.now += 1.5
+        self.recorder.record_event({"event": "parameters.time.sunset", "params": {"a": 1}})
+        self.recorder.record_command("set_dots", most_left=True)
+        infos = self.recorder.stop()
+
+        self.assertEqual(infos, {"path": self.path, "records": 3})
+        self.assertEqual(
+            list(read_trace(self.path)),
+            [
+                (0.0, "start", "trace", {"time": 1600000000.0}),
+                (0.0, "render", "MessageProfile", {"message": "1234"}),
+                (1.5, "event", "parameters.time.sunset", {"a": 1}),
+                (1.5, "command", "set_dots", {"most_left": True}),
+            ],
+        )
+
+    def test_record_not_started(self):
+        self.recorder.record_command("clear")
+
+        self.assertFalse(self.recorder.is_recording())
+        self.assertEqual(self.recorder.records, 0)
+
+    def test_record_max_records(self):
+        self.recorder.MAX_RECORDS = 2
+        self.recorder.start(self.path)
+
+        self.recorder.record_command("clear")
+        self.recorder.record_command("clear")
+        self.recorder.record_command("clear")
+
+        self.assertFalse(self.recorder.is_recording())
+        # start record is not counted
+        self.assertEqual(len(list(read_trace(self.path))), 3)
+
+
+class TestsDisplayProcess(unittest.TestCase):
+    def setUp(self):
+        self.shared = [0] * SHARED_SIZE
+        self.shared[SHARED_BRIGHTNESS] = UNSET
+        self.shared[SHARED_BLINK] = UNSET
+        self.lib = Mock()
+
+    def init_process(self, mock_multiprocessing):
+        context = mock_multiprocessing.get_context.return_value
+        context.RawArray.return_value = self.shared
+        context.RawValue.side_effect = lambda typecode, value: Mock(value=value)
+        context.Pipe.return_value = (Mock(), Mock())
+        self.scheduler = Mock()
+        self.process = DisplayProcess(self.scheduler)
+        self.process.start()
+        self.connection = context.Pipe.return_value[1]
+        self.context = context
+
+    def test_read_shared_state(self):
+        self.shared[SHARED_SEQUENCE] = 2
+        self.shared[SHARED_DIGITS : SHARED_DIGITS + 4] = [1, 2, 3, 4]
+        self.shared[SHARED_BRIGHTNESS] = 10
+
+        self.assertEqual(read_shared_state(self.shared), (2, (1, 2, 3, 4), 10, UNSET))
+
+    def test_apply_shared_state(self):
+        self.shared[SHARED_SEQUENCE] = 2
+        self.shared[SHARED_DIGITS : SHARED_DIGITS + 4] = [1, 2, 3, 4]
+        self.shared[SHARED_BRIGHTNESS] = 10
+        applied = {}
+
+        sequence = apply_shared_state(self.lib, self.shared, applied)
+
+        self.assertEqual(sequence, 2)
+        self.lib.set_brightness.assert_called_with(10)
+        self.assertFalse(self.lib.set_blink.called)
+        self.lib.set_digit_raw.assert_has_calls([call(0, 1), call(1, 2), call(2, 3), call(3, 4)])
+        self.lib.show.assert_called_once()
+
+    def test_apply_shared_state_unchanged(self):
+        self.shared[SHARED_DIGITS : SHARED_DIGITS + 4] = [1, 2, 3, 4]
+        self.shared[SHARED_BRIGHTNESS] = 10
+        applied = {}
+        apply_shared_state(self.lib, self.shared, applied)
+        self.lib.reset_mock()
+
+        apply_shared_state(self.lib, self.shared, applied)
+
+        self.assertFalse(self.lib.set_brightness.called)
+        self.assertFalse(self.lib.show.called)
+
+    @patch("backend.displayprocess.os")
+    @patch("backend.displayprocess.multiprocessing")
+    def test_show(self, mock_multiprocessing, mock_os):
+        self.init_process(mock_multiprocessing)
+        self.connection.reset_mock()
+
+        self.process.set_digit_raw(1, 42)
+        self.process.show()
+
+        self.assertEqual(self.shared[SHARED_DIGITS : SHARED_DIGITS + 4], [0, 42, 0, 0])
+        self.assertEqual(self.shared[SHARED_SEQUENCE], 2)
+        self.connection.send_bytes.assert_called()
+        self.scheduler.schedule.assert_called()
+
+    @patch("backend.displayprocess.os")
+    @patch("backend.displayprocess.multiprocessing")
+    def test_show_process_busy(self, mock_multiprocessing, mock_os):
+        self.init_process(mock_multiprocessing)
+        self.connection.send_bytes.side_effect = BlockingIOError()
+
+        try:
+            self.process.show()
+        except Exception:
+            self.fail("Show should not fail when process is busy")
+
+    @patch("backend.displayprocess.os")
+    @patch("backend.displayprocess.multiprocessing")
+    def test_supervise_state_applied(self, mock_multiprocessing, mock_os):
+        self.init_process(mock_multiprocessing)
+        self.process.show()
+        self.process._DisplayProcess__ack.value = self.shared[SHARED_SEQUENCE]
+        self.scheduler.reset_mock()
+
+        self.process._DisplayProcess__supervise()
+
+        self.assertFalse(self.scheduler.schedule.called)
+
+    @patch("backend.displayprocess.time")
+    @patch("backend.displayprocess.os")
+    @patch("backend.displayprocess.multiprocessing")
+    def test_supervise_process_hung(self, mock_multiprocessing, mock_os, mock_time):
+        mock_time.monotonic.return_value = 100.0
+        self.init_process(mock_multiprocessing)
+        self.process.show()
+        mock_time.monotonic.return_value = 106.0
+        self.scheduler.reset_mock()
+
+        self.process._DisplayProcess__supervise()
+        restart = self.scheduler.schedule.call_args[0][1]
+        restart()
+
+        self.context.Process.return_value.kill.assert_called()
+        self.assertEqual(self.context.Process.return_value.start.call_count, 2)
+        self.assertEqual(self.process.restarts, 1)
+
+    @patch("backend.displayprocess.time")
+    @patch("backend.displayprocess.os")
+    @patch("backend.displayprocess.multiprocessing")
+    def test_supervise_process_hung_steady_traffic(self, mock_multiprocessing, mock_os, mock_time):
+        mock_time.monotonic.return_value = 100.0
+        self.init_process(mock_multiprocessing)
+
+        # new states keep coming but none is applied
+        for now in (101.0, 103.0, 105.0, 107.0):
+            mock_time.monotonic.return_value = now
+            self.process.show()
+            self.scheduler.reset_mock()
+            self.process._DisplayProcess__supervise()
+
+        restart = self.scheduler.schedule.call_args[0][1]
+        restart()
+        self.assertEqual(self.process.restarts, 1)
+
+    @patch("backend.displayprocess.time")
+    @patch("backend.displayprocess.os")
+    @patch("backend.displayprocess.multiprocessing")
+    def test_supervise_process_busy(self, mock_multiprocessing, mock_os, mock_time):
+        mock_time.monotonic.return_value = 100.0
+        self.init_process(mock_multiprocessing)
+        self.process.show()
+        mock_time.monotonic.return_value = 106.0
+        # process is still looping but lags behind
+        self.process._DisplayProcess__heartbeat.value = 105.0
+        self.scheduler.reset_mock()
+
+        self.process._DisplayProcess__supervise()
+
+        self.scheduler.schedule.assert_called_once_with(
+            DisplayProcess.HANG_TIMEOUT, self.process._DisplayProcess__supervise
+        )
+        self.assertEqual(self.process.restarts, 0)
+
+    @patch("backend.displayprocess.os")
+    @patch("backend.displayprocess.multiprocessing")
+    def test_stop(self, mock_multiprocessing, mock_os):
+        self.init_process(mock_multiprocessing)
+        self.context.Process.return_value.is_alive.return_value = False
+
+        self.process.stop()
+
+        self.connection.close.assert_called()
+        self.context.Process.return_value.join.assert_called()
+        self.assertFalse(self.context.Process.return_value.kill.called)
+
+
+class TestsScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_schedule(self):
+        done = threading.Event()
+        callback = Mock(side_effect=lambda *args: done.set())
+
+        self.scheduler.schedule(0.05, callback, args=(1, 2))
+
+        self.assertTrue(done.wait(1.0))
+        callback.assert_called_once_with(1, 2)
+        self.assertEqual(self.scheduler.get_pending_count(), 0)
+
+    def test_schedule_order(self):
+        done = threading.Event()
+        calls = []
+        self.scheduler.schedule(0.1, lambda: (calls.append(2), done.set()))
+        self.scheduler.schedule(0.05, lambda: calls.append(1))
+
+        self.assertTrue(done.wait(1.0))
+        self.assertEqual(calls, [1, 2])
+
+    def test_cancel(self):
+        callback = Mock()
+        task = self.scheduler.schedule(0.05, callback)
+
+        self.scheduler.cancel(task)
+        time.sleep(0.1)
+
+        self.assertFalse(callback.called)
+        self.assertEqual(self.scheduler.get_pending_count(), 0)
+
+    def test_cancel_none(self):
+        try:
+            self.scheduler.cancel(None)
+        except Exception:
+            self.fail("Cancel None task should not fail")
+
+    def test_coalesce_tasks_due_in_same_tick(self):
+        done = threading.Event()
+        callback = Mock()
+        self.scheduler.schedule(0.05, callback)
+        self.scheduler.schedule(0.052, callback)
+        self.scheduler.schedule(0.053, lambda: done.set())
+
+        self.assertTrue(done.wait(1.0))
+        self.assertEqual(callback.call_count, 2)
+        self.assertEqual(self.scheduler.wakeups, 1)
+
+    def test_no_wakeup_without_task(self):
+        task = self.scheduler.schedule(10.0, Mock())
+        self.scheduler.cancel(task)
+
+        time.sleep(0.1)
+
+        self.assertEqual(self.scheduler.wakeups, 0)
+
+    def test_callback_exception_does_not_stop_scheduler(self):
+        done = threading.Event()
+        self.scheduler.schedule(0.01, Mock(side_effect=Exception("Test exception")))
+        self.scheduler.schedule(0.05, lambda: done.set())
+
+        self.assertTrue(done.wait(1.0))
+
+    def test_lag(self):
+        done = threading.Event()
+
+        def slow_task():
+            time.sleep(0.1)
+
+        self.scheduler.schedule(0.01, slow_task)
+        self.scheduler.schedule(0.015, lambda: done.set())
+
+        self.assertTrue(done.wait(1.0))
+        self.assertGreater(self.scheduler.lag, 0.01)
+
+    def test_schedule_after_stop(self):
+        callback = Mock()
+        self.scheduler.schedule(0.01, Mock())
+        self.scheduler.stop()
+
+        task = self.scheduler.schedule(0.01, callback)
+        time.sleep(0.1)
+
+        self.assertTrue(task.cancelled)
+        self.assertFalse(callback.called)
+        self.assertEqual(self.scheduler.get_pending_count(), 0)
+
+    def test_run_pending_without_thread(self):
+        now = [100.0]
+        scheduler = Scheduler(clock=lambda: now[0], threaded=False)
+        callback = Mock()
+        scheduler.schedule(5.0, callback, args=(1,))
+        scheduler.schedule(10.0, callback, args=(2,))
+
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.assertEqual(scheduler.get_next_deadline(), 105.0)
+        now[0] = 105.0
+        self.assertEqual(scheduler.run_pending(), 1)
+
+        callback.assert_called_once_with(1)
+        self.assertEqual(scheduler.get_next_deadline(), 110.0)
+        self.assertEqual(scheduler.wakeups, 1)
+
+
+class TestsFrameSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.gettempdir(), "fourletterdisplay.test.snapshot")
+        self.snapshot = FrameSnapshot(
+            KIND_VALUE, 1000.0, 2000.0, (1, 2, 3, 0x4004), [True, False, False, True], 500
+        )
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_pack_unpack(self):
+        data = pack_snapshot(self.snapshot)
+
+        self.assertEqual(len(data), 33)
+        self.assertEqual(unpack_snapshot(data, 1500.0), self.snapshot)
+
+    def test_unpack_expired_content(self):
+        snapshot = unpack_snapshot(pack_snapshot(self.snapshot), 2500.0)
+
+        self.assertEqual(snapshot.kind, KIND_NONE)
+        self.assertEqual(snapshot.digits, (0, 0, 0, 0))
+        self.assertEqual(snapshot.dots, [True, False, False, True])
+        self.assertEqual(snapshot.blink, 500)
+
+    def test_unpack_content_without_expiration(self):
+        snapshot = self.snapshot._replace(kind=KIND_MESSAGE, expires_at=None)
+
+        self.assertEqual(unpack_snapshot(pack_snapshot(snapshot), 1e10), snapshot)
+
+    def test_unpack_invalid_data(self):
+        self.assertIsNone(unpack_snapshot(b"", 0.0))
+        self.assertIsNone(unpack_snapshot(b"x" * 33, 0.0))
+
+    def test_save_load(self):
+        cleep_filesystem = make_cleep_filesystem()
+
+        save_snapshot(cleep_filesystem, self.path, pack_snapshot(self.snapshot))
+
+        self.assertEqual(load_snapshot(self.path, 1500.0), self.snapshot)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        # root filesystem is read-only, file must be written through cleep filesystem
+        cleep_filesystem.open.assert_called_once_with(f"{self.path}.tmp", "wb")
+        cleep_filesystem.close.assert_called_once()
+        cleep_filesystem.rename.assert_called_once_with(f"{self.path}.tmp", self.path)
+
+    def test_load_missing_file(self):
+        self.assertIsNone(load_snapshot(self.path, 0.0))
+
+
+class TestsSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.gettempdir(), "fourletterdisplay.test.snapshot")
+        self.scheduler = Mock()
+        self.cleep_filesystem = make_cleep_filesystem()
+        self.now = 100.0
+        self.snapshot = FrameSnapshot(
+            KIND_MESSAGE, 0.0, None, (1, 2, 3, 4), [False, True, False, False], 0
+        )
+        self.store = SnapshotStore(
+            self.scheduler,
+            self.cleep_filesystem,
+            self.path,
+            lambda: self.snapshot,
+            clock=lambda: self.now,
+            wall_clock=lambda: 1000.0,
+        )
+        self.store.start()
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_schedule_coalesce_changes(self):
+        self.store.schedule()
+        self.store.schedule()
+
+        self.scheduler.schedule.assert_called_once_with(SnapshotStore.SAVE_DELAY, self.store.save)
+
+    def test_schedule_value_brought_forward(self):
+        self.store.schedule(KIND_VALUE)
+        self.store.schedule(KIND_VALUE)
+        self.scheduler.schedule.assert_called_once_with(
+            SnapshotStore.VALUE_SAVE_DELAY, self.store.save
+        )
+
+        self.store.schedule()
+
+        self.scheduler.cancel.assert_called_with(self.scheduler.schedule.return_value)
+        self.scheduler.schedule.assert_called_with(SnapshotStore.SAVE_DELAY, self.store.save)
+
+    def test_schedule_not_started(self):
+        store = SnapshotStore(self.scheduler, self.cleep_filesystem, self.path, Mock())
+
+        store.schedule()
+
+        self.assertFalse(self.scheduler.schedule.called)
+
+    def test_save(self):
+        self.store.save()
+
+        self.assertEqual(
+            load_snapshot(self.path, 1000.0), self.snapshot._replace(saved_at=1000.0)
+        )
+
+    def test_save_unchanged(self):
+        self.store.save()
+        self.cleep_filesystem.reset_mock()
+
+        self.store.save()
+
+        self.assertFalse(self.cleep_filesystem.open.called)
+
+    def test_save_content_not_restored(self):
+        self.snapshot = self.snapshot._replace(kind=KIND_NONE)
+
+        self.store.save()
+
+        self.assertEqual(load_snapshot(self.path, 1000.0).digits, (0, 0, 0, 0))
+
+    def test_save_failed(self):
+        self.cleep_filesystem.open.side_effect = OSError("Read-only file system")
+
+        try:
+            self.store.save()
+        except Exception:
+            self.fail("Save failure should not raise exception")
+
+    def test_load_restored_snapshot_not_saved_again(self):
+        self.store.save()
+        self.cleep_filesystem.reset_mock()
+        store = SnapshotStore(
+            self.scheduler, self.cleep_filesystem, self.path, lambda: self.snapshot
+        )
+
+        self.assertEqual(store.load().digits, (1, 2, 3, 4))
+        store.save()
+
+        self.assertFalse(self.cleep_filesystem.open.called)
+
+    def test_stop(self):
+        self.store.stop()
+        self.store.schedule()
+
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(self.scheduler.schedule.called)
+
+
+class TestsBrightnessController(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Mock()
+        self.config = {"brightness": 15, "nightbrightness": 4, "nightmode": True}
+        self.write_level = Mock()
+        self.on_change = Mock()
+        self.now = 1000.0
+        self.controller = BrightnessController(
+            self.scheduler,
+            self.config.get,
+            self.write_level,
+            on_change=self.on_change,
+            clock=lambda: self.now,
+        )
+
+    def test_apply(self):
+        self.assertTrue(self.controller.apply())
+
+        self.write_level.assert_called_once_with(15)
+        self.assertEqual(self.controller.level, 15)
+
+    def test_apply_same_level(self):
+        self.controller.apply()
+        self.write_level.reset_mock()
+
+        self.assertFalse(self.controller.apply())
+
+        self.assertFalse(self.write_level.called)
+
+    def test_apply_night(self):
+        self.controller.is_night = True
+        self.controller.apply()
+
+        self.write_level.assert_called_once_with(4)
+
+    def test_apply_night_mode_disabled(self):
+        self.config["nightmode"] = False
+        self.controller.is_night = True
+        self.controller.apply()
+
+        self.write_level.assert_called_once_with(15)
+
+    def test_invalidate(self):
+        self.controller.apply()
+        self.controller.invalidate()
+
+        self.assertTrue(self.controller.apply())
+        self.assertEqual(self.write_level.call_count, 2)
+
+    def test_restore(self):
+        save_level = Mock()
+        controller = BrightnessController(
+            self.scheduler, self.config.get, self.write_level, save_level=save_level
+        )
+
+        controller.restore(15)
+
+        self.write_level.assert_called_once_with(15)
+        self.assertFalse(save_level.called)
+        self.assertFalse(controller.apply())
+
+    def test_apply_save_level(self):
+        save_level = Mock()
+        controller = BrightnessController(
+            self.scheduler, self.config.get, self.write_level, save_level=save_level
+        )
+
+        controller.apply()
+
+        save_level.assert_called_once_with(15)
+
+    def test_sun_schedule_before_sunrise(self):
+        self.controller.set_sun_schedule(1100.0, 2000.0)
+
+        self.assertTrue(self.controller.is_night)
+        self.write_level.assert_called_once_with(4)
+        self.scheduler.schedule.assert_called_once_with(100.0, unittest.mock.ANY)
+        self.on_change.assert_called_once()
+
+    def test_sun_schedule_during_day(self):
+        self.controller.set_sun_schedule(900.0, 2000.0)
+
+        self.assertFalse(self.controller.is_night)
+        self.write_level.assert_called_once_with(15)
+        self.scheduler.schedule.assert_called_once_with(1000.0, unittest.mock.ANY)
+        self.assertFalse(self.on_change.called)
+
+    def test_sun_schedule_after_sunset(self):
+        self.controller.set_sun_schedule(100.0, 900.0)
+
+        self.assertTrue(self.controller.is_night)
+        self.scheduler.schedule.assert_called_once_with(
+            100.0 + DAY_DURATION - 1000.0, unittest.mock.ANY
+        )
+
+    def test_sun_schedule_unchanged(self):
+        self.controller.set_sun_schedule(900.0, 2000.0)
+        self.scheduler.reset_mock()
+
+        self.controller.set_sun_schedule(900.0, 2000.0)
+
+        self.assertFalse(self.scheduler.schedule.called)
+
+    def test_transition(self):
+        self.controller.set_sun_schedule(900.0, 2000.0)
+        self.write_level.reset_mock()
+
+        self.now = 2000.0
+        self.scheduler.schedule.call_args[0][1]()
+
+        self.assertTrue(self.controller.is_night)
+        self.write_level.assert_called_once_with(4)
+        self.scheduler.cancel.assert_called()
+
+    def test_transition_stale_schedule(self):
+        self.controller.set_sun_schedule(900.0, 2000.0)
+        self.now = 2000.0 + 2 * DAY_DURATION
+        transition = self.scheduler.schedule.call_args[0][1]
+
+        # transitions run at same instant must not be rescheduled in the past
+        transition()
+        transition()
+
+        self.assertTrue(self.controller.is_night)
+        self.scheduler.schedule.assert_called_with(
+            900.0 + 3 * DAY_DURATION - self.now, unittest.mock.ANY
+        )
+
+        # next sunrise is guessed from known schedule
+        self.now = 900.0 + 3 * DAY_DURATION
+        transition()
+
+        self.assertFalse(self.controller.is_night)
+        self.assertEqual(self.controller.level, 15)
+        self.scheduler.schedule.assert_called_with(1100.0, unittest.mock.ANY)
+
+
+class TestsLoadMonitor(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Mock(lag=0.0)
+        self.loadavg = [0.0, 0.0, 0.0]
+        self.on_change = Mock()
+        self.monitor = LoadMonitor(
+            self.scheduler,
+            on_change=self.on_change,
+            getloadavg=lambda: self.loadavg,
+        )
+        self.monitor.set_thresholds(0.1, 1000.0)
+
+    def test_normal(self):
+        self.assertEqual(self.monitor.check(), LoadMonitor.LEVEL_NORMAL)
+        self.assertEqual(self.monitor.get_redraw_period(), 0.0)
+        self.assertFalse(self.on_change.called)
+
+    def test_lag_above_threshold(self):
+        self.scheduler.lag = 0.15
+        self.assertEqual(self.monitor.check(), LoadMonitor.LEVEL_REDUCED)
+
+        self.scheduler.lag = 0.25
+        self.assertEqual(self.monitor.check(), LoadMonitor.LEVEL_MINIMAL)
+
+        self.assertEqual(self.monitor.changes, 2)
+        self.on_change.assert_called_with(LoadMonitor.LEVEL_MINIMAL)
+
+    def test_load_above_threshold(self):
+        self.monitor.set_thresholds(0.1, 0.0001)
+        self.loadavg = [1.0, 0.0, 0.0]
+
+        self.assertEqual(self.monitor.check(), LoadMonitor.LEVEL_MINIMAL)
+
+    def test_recovery_one_level_at_a_time(self):
+        self.scheduler.lag = 1.0
+        self.monitor.check()
+
+        self.scheduler.lag = 0.12
+        self.assertEqual(self.monitor.check(), LoadMonitor.LEVEL_REDUCED)
+        # still above recovery threshold
+        self.assertEqual(self.monitor.check(), LoadMonitor.LEVEL_REDUCED)
+
+        self.scheduler.lag = 0.05
+        self.assertEqual(self.monitor.check(), LoadMonitor.LEVEL_NORMAL)
+        self.assertEqual(self.monitor.changes, 3)
+
+    def test_loadavg_unavailable(self):
+        self.monitor = LoadMonitor(self.scheduler, getloadavg=Mock(side_effect=OSError()))
+
+        self.assertEqual(self.monitor.check(), LoadMonitor.LEVEL_NORMAL)
+
+    def test_get_infos(self):
+        self.scheduler.lag = 0.15
+        self.monitor.check()
+
+        self.assertEqual(
+            self.monitor.get_infos(),
+            {"level": 1, "changes": 1, "postponed": 0, "lag": 150.0, "load": 0.0},
+        )
+
+    def test_notify_activity(self):
+        self.monitor.notify_activity()
+        self.monitor.notify_activity()
+
+        self.scheduler.schedule.assert_called_once_with(0.0, unittest.mock.ANY)
+
+    def test_checks_only_while_active(self):
+        now = [100.0]
+        is_active = Mock(return_value=False)
+        monitor = LoadMonitor(
+            self.scheduler,
+            is_active=is_active,
+            getloadavg=lambda: self.loadavg,
+            clock=lambda: now[0],
+        )
+        monitor.notify_activity()
+        run_check = self.scheduler.schedule.call_args[0][1]
+
+        # recent activity
+        run_check()
+        self.scheduler.schedule.assert_called_with(LoadMonitor.CHECK_INTERVAL, run_check)
+
+        # pending degradable work
+        now[0] += LoadMonitor.CHECK_INTERVAL
+        is_active.return_value = True
+        self.scheduler.reset_mock()
+        run_check()
+        self.scheduler.schedule.assert_called_with(LoadMonitor.CHECK_INTERVAL, run_check)
+
+        # idle
+        is_active.return_value = False
+        self.scheduler.reset_mock()
+        run_check()
+        self.assertFalse(self.scheduler.schedule.called)
+
+        # activity restarts checks
+        monitor.notify_activity()
+        self.scheduler.schedule.assert_called_once_with(0.0, run_check)
+
+
+
+class TestsRedrawThrottle(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Mock()
+        self.load_monitor = Mock(postponed=0)
+        self.load_monitor.get_redraw_period.return_value = 0.0
+        self.can_redraw = Mock(return_value=True)
+        self.now = 100.0
+        self.throttle = RedrawThrottle(
+            self.scheduler, self.load_monitor, can_redraw=self.can_redraw, clock=lambda: self.now
+        )
+        self.redraw = Mock()
+
+    def test_redraw(self):
+        self.throttle.redraw(self.redraw, 1, 2)
+
+        self.redraw.assert_called_once_with(1, 2)
+        self.load_monitor.notify_activity.assert_called_once()
+        self.assertFalse(self.throttle.is_pending())
+
+    def test_redraw_postponed(self):
+        self.load_monitor.get_redraw_period.return_value = 5.0
+        self.throttle.redraw(self.redraw, 1)
+        self.now += 1.0
+
+        self.throttle.redraw(self.redraw, 2)
+        self.throttle.redraw(self.redraw, 3)
+
+        self.redraw.assert_called_once_with(1)
+        self.scheduler.schedule.assert_called_once_with(4.0, unittest.mock.ANY)
+        self.assertTrue(self.throttle.is_pending())
+        self.assertEqual(self.load_monitor.postponed, 2)
+
+        # only last postponed redraw is run
+        self.scheduler.schedule.call_args[0][1]()
+        self.redraw.assert_called_with(3)
+        self.assertEqual(self.redraw.call_count, 2)
+
+    def test_postponed_redraw_outdated(self):
+        self.load_monitor.get_redraw_period.return_value = 5.0
+        self.throttle.redraw(self.redraw, 1)
+        self.throttle.redraw(self.redraw, 2)
+        self.can_redraw.return_value = False
+
+        self.scheduler.schedule.call_args[0][1]()
+
+        self.redraw.assert_called_once_with(1)
+
+    def test_drop(self):
+        self.load_monitor.get_redraw_period.return_value = 5.0
+        self.throttle.redraw(self.redraw, 1)
+        self.throttle.redraw(self.redraw, 2)
+
+        self.throttle.drop()
+
+        self.scheduler.cancel.assert_called_once_with(self.scheduler.schedule.return_value)
+        self.assertFalse(self.throttle.is_pending())
+
+
 if __name__ == "__main__":
     # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_fourletterdisplay.py; coverage report -m -i
     unittest.main()